@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import threading
+import zipfile
+
+###########
+# Classes #
+###########
+
+class ZipArchiveWriter:
+    """
+    ZIP archive that output files are written straight into as they are produced.
+    Names are kept unique with an in-memory count per name, so that duplicates get
+    " (1)", " (2)"... suffixes without probing the archive. Writes are thread-safe.
+    """
+    def __init__(self, zip_path):
+        self.zip_path = zip_path
+        self.zipf = zipfile.ZipFile(zip_path, "w")
+        self.name_counts = {}
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def unique_name(self, stem, extension):
+        """
+        Get a name that is not yet in the archive. Must be called with the lock held.
+
+        Args:
+            stem (str): Name without extension, e.g. the DO number
+            extension (str): Extension including the dot, e.g. ".pdf"
+
+        Returns:
+            name (str): Unique name within the archive
+        """
+        count = self.name_counts.get(stem, 0)
+        self.name_counts[stem] = count + 1
+        return f"{stem}{extension}" if count == 0 else f"{stem} ({count}){extension}"
+
+    def write(self, stem, data, extension=".pdf"):
+        """
+        Add a file to the archive.
+
+        Args:
+            stem (str): Name without extension, e.g. the DO number
+            data (bytes): Content of the file
+            extension (str): Optional. Extension including the dot. Defaults to ".pdf"
+
+        Returns:
+            name (str): Name the file was added under
+        """
+        with self.lock:
+            name = self.unique_name(stem, extension)
+            self.zipf.writestr(name, data)
+        return name
+
+    def close(self):
+        """
+        Finish the archive by writing its central directory.
+        """
+        with self.lock:
+            self.zipf.close()
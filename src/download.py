@@ -22,6 +22,9 @@ from src.utils import zip_pdfs
 load_dotenv()
 output_path = os.getenv('OUTPUT_PATH')
 
+# Options that write their output straight into the archive, which is finished when processing ends
+streamed_options = ["SINMIX"]
+
 #############
 # Functions #
 #############
@@ -50,20 +53,24 @@ def download_xlsx(option, result):
 
 def download_zip(option):
     """
-    Download zipped file containing processed PDFs.
+    Download zipped file containing processed PDFs. Streamlit has no streamed
+    file endpoint, so st.download_button still reads the whole archive into its
+    media file manager.
 
     Args:
         option (str): Selected option
     """
     zip_filename = f"{option}.zip"
     zip_path = os.path.join(output_path, zip_filename)
-    zip_pdfs(output_path, zip_path)
+
+    # Other options leave their PDFs in the output folder, so zip them afresh on every run
+    if option not in streamed_options:
+        zip_pdfs(output_path, zip_path)
 
     with open(zip_path, "rb") as file:
-        bytes_data = file.read()
         st.download_button(
             label="Download result",
-            data=bytes_data,
+            data=file,
             file_name=zip_filename,
             mime="application/zip"
         )
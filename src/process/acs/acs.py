@@ -13,6 +13,8 @@ from PyPDF2 import PdfReader
 
 # Custom
 from .acs_utils import add_data, get_data, get_totals
+from ..common.line_classifier import LineClassifier
+from ..common.results import ResultAccumulator
 
 ##################
 # Configurations #
@@ -43,6 +45,16 @@ subtotal_pattern = re.compile(
     flags=re.IGNORECASE
 )
 
+# Keywords that route each line to the patterns it may match, in one pass over the line
+line_classifier = LineClassifier({
+    "inv_no": re.escape("INVOICE NO"),
+    "date": re.escape("DATE:"),
+    "loc_subcon": "@",
+    "details": r"^\s*\d{2}/\d{2}/\d{4}",
+    "underload": re.escape("UNDERLOAD CHARGES"),
+    "sub_total": re.escape("SUB-TOTAL"),
+})
+
 #############
 # Functions #
 #############
@@ -83,6 +95,11 @@ def process_pdf(df_all, pdf_file_paths):
         "Vendor Invoice Amount",
     ]
 
+    # Collect the rows of all files, after any rows given
+    results = ResultAccumulator(data_headers)
+    if df_all is not None:
+        results.add_frame(df_all)
+
     # Loop through all PDF files
     for f in pdf_file_paths:
         pdf_file = PdfReader(open(f, 'rb'))
@@ -101,25 +118,30 @@ def process_pdf(df_all, pdf_file_paths):
             lines = text.split('\n')
 
             for i in range(len(lines)):
+                # Skip lines without any keyword
+                kinds = line_classifier.classify(lines[i])
+                if not kinds:
+                    continue
+
                 # Get reference number
                 if inv_no is None:
-                    if ('INVOICE NO' in lines[i].upper()) and (len(lines[i].split(' ')[-1]) == 6):
+                    if ('inv_no' in kinds) and (len(lines[i].split(' ')[-1]) == 6):
                         inv_no = lines[i].split(' ')[-1]
 
                 # Get invoice date
                 if date is None:
-                    if ('DATE:' in lines[i].upper()) and (lines[i].count('/') == 2):
+                    if ('date' in kinds) and (lines[i].count('/') == 2):
                         date = lines[i].split(' ')[-1]
                         date = pd.to_datetime(date, format='%d/%m/%Y').strftime('%d %b %Y')
 
                 # Get subcon and location
-                match = re.search(loc_subcon_pattern, lines[i])
+                match = re.search(loc_subcon_pattern, lines[i]) if 'loc_subcon' in kinds else None
                 if match:
                     subcon = match.group("subcon").strip().upper() if not None else ""
                     location = match.group("location").strip() if not None else ""
 
                 # Get invoice details
-                match = inv_pattern.match(lines[i])
+                match = inv_pattern.match(lines[i]) if 'details' in kinds else None
                 if match:
                     do_date = pd.to_datetime(match.group("date"), format='%d/%m/%Y').strftime('%d %b %Y')
                     do_mth = pd.to_datetime(match.group("date"), format='%d/%m/%Y').strftime('%Y %m')
@@ -131,7 +153,7 @@ def process_pdf(df_all, pdf_file_paths):
                     contents.append([do_mth, do_date, do_no, do_desc, do_qty, do_unitprice, do_invamt])
 
                 # Get underload charges
-                if 'UNDERLOAD CHARGES' in lines[i].upper():
+                if 'underload' in kinds:
                     previous = contents[-1]
                     underload = [
                         previous[0], 
@@ -145,7 +167,7 @@ def process_pdf(df_all, pdf_file_paths):
                     contents.append(underload)
 
                 # Get sub-total
-                if 'SUB-TOTAL' in lines[i].upper():
+                if 'sub_total' in kinds:
                     match = re.search(subtotal_pattern, lines[i])
                     if match:
                         sub_total = float(match.group(1).replace(',', ''))
@@ -198,16 +220,12 @@ def process_pdf(df_all, pdf_file_paths):
             subcon=subcon,
         )
 
-        # Add empty row
-        df_data.loc[total_rows] = pd.Series(dtype='object')
+        # Add the rows of the file, and an empty row
+        results.add_frame(df_data)
+        results.add_empty_row()
 
-        # Append data to df_all
-        if df_all is None:
-            df_all = df_data
-        else:
-            df_all = pd.concat([df_all, df_data])
-
-    return df_all
+    # Build the dataframe once, from the rows of all files
+    return results.build()
 
 
 def process_excel(excel_file_path):
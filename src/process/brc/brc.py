@@ -5,12 +5,12 @@
 ####################
 
 # Libs
-import pandas as pd
 import streamlit as st
 from PyPDF2 import PdfReader
 
 # Custom
-from .brc_utils import complete_table, get_table
+from .brc_utils import get_header_fields, get_table, table_headers
+from ..common.results import ResultAccumulator
 
 #############
 # Functions #
@@ -28,29 +28,8 @@ def brc_main(pdf_file_paths):
         dfs (pandas.core.frame.DataFrame): Dataframe with extracted data
         error_files (list): List of error files
     """
-    # Initialize dataframe
-    headers = [
-        "INVOICE NO. 1",
-        "INVOICE DATE",
-        "TOTAL AMT",
-        "INVOICE NO. 2",
-        "FOR MONTH (YYYY MM)",
-        "ZONE",
-        "LOCATION",
-        "SUBCON",
-        "ORDER REF.",
-        "DATE REQ.",
-        "DO/NO",
-        "DESCRIPTION",
-        "CODE 1",
-        "CODE 2",
-        "QTY",
-        "UNIT",
-        "VENDOR INVOICE UNIT PRICE (S$)",
-        "PER",
-        "PDF SUBTOTAL",
-    ]
-    dfs = pd.DataFrame(columns=headers)
+    # Rows of the table of each file
+    results = ResultAccumulator(table_headers)
 
     # List to hold error files
     error_files = []
@@ -62,23 +41,18 @@ def brc_main(pdf_file_paths):
     # Iterate through files
     for index, f in enumerate(pdf_file_paths):
         try:
-            # Get table from PDF
-            table = get_table(f)
-
             # Get other variables of interest
-            pdf_file = PdfReader(open(f, "rb"))
+            pdf_file = PdfReader(f)
             page = pdf_file.pages[0]
             text = page.extract_text()
             lines = text.split("\n")
-            
-            # Add extracted info to table
-            table = complete_table(table, lines)
+            fields = get_header_fields(lines)
 
-            # Sort table columns
-            table = table[headers]
+            # Get table from PDF, with the extracted info
+            table = get_table(f, fields)
 
-            # Append to dataframe
-            dfs = pd.concat([dfs, table], ignore_index=True)
+            # Add the rows of the table
+            results.add_frame(table)
 
         except Exception as e:
             # If there's an error, log the file path
@@ -94,4 +68,7 @@ def brc_main(pdf_file_paths):
                 f"({int(percent_complete*100)}% complete)"
             )
 
+    # Build the dataframe once, from the rows of all tables
+    dfs = results.build()
+
     return dfs, error_files
@@ -5,17 +5,23 @@
 ####################
 
 # Generic/Built-in
+import os
 import re
 from datetime import datetime
 
 # Libs
 import pandas as pd
 import pytesseract
-import tabula
-from pdf2image import convert_from_path
 
 # Custom
-from ...config import poppler_path, tesseract_path
+from ..common.layout_hints import hint_options, load_layout_hints
+from ..common.page_model import build_page_document
+from ..common.pdf_tables import read_page_tables
+from ..common.regions import detect_text_regions
+from ..common.render import render_page_cached
+from ..common.reocr import read_field
+from ..common.word_tables import read_word_tables
+from ...config import tesseract_path
 
 ##################
 # Configurations #
@@ -23,30 +29,179 @@ from ...config import poppler_path, tesseract_path
 
 pytesseract.pytesseract.tesseract_cmd = tesseract_path
 
+# Only OCR the detected text regions instead of the whole page. Off until timed against
+# whole-page reads on real scans, as each region is a separate tesseract call
+region_ocr = False
+
+# Whether to OCR only the stamp lines of the scanned page, located with a quick low-resolution pass
+stamp_crop = True
+
+# Scale of the quick pass used to locate the stamp lines
+locate_scale = 0.5
+
+# Labels of the stamp lines read from the scanned page
+stamp_labels = ("DATE REQUIRED", "PART OF JOB")
+
+# Margin kept above and below the stamp lines, in pixels of the full-size page
+stamp_margin = 40
+
+date_req_pattern = re.compile(r"(?P<date_req>\d{1,2}/\d{1,2}/\d{4})")
+
+# Engine the item table is read with, "tabula" or "words" for poppler word boxes without Java
+table_engine = "tabula"
+
+# Folder the tabula layout hints are calibrated into, see calibrate_layout_hints
+vendor_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Headers of all 9 item table columns, for the "words" engine, so that every word falls under its own column
+word_headers = ["IT", "DO/NO", "DESCRIPTION", "QTY", "UNIT", "UNIT PRICE", "PER", "DISC.", ("$ AMOUNT", "AMOUNT IN SGD")]
+
+# Item table columns that are not used, dropped once the words are split into cells
+unused_columns = ["IT", "DISC."]
+
+# Line after the last item, for the "words" engine
+total_pattern = re.compile(r"\bTOTAL\b", re.IGNORECASE)
+
+# Columns of the result, in order
+table_headers = [
+    "INVOICE NO. 1",
+    "INVOICE DATE",
+    "TOTAL AMT",
+    "INVOICE NO. 2",
+    "FOR MONTH (YYYY MM)",
+    "ZONE",
+    "LOCATION",
+    "SUBCON",
+    "ORDER REF.",
+    "DATE REQ.",
+    "DO/NO",
+    "DESCRIPTION",
+    "CODE 1",
+    "CODE 2",
+    "QTY",
+    "UNIT",
+    "VENDOR INVOICE UNIT PRICE (S$)",
+    "PER",
+    "PDF SUBTOTAL",
+]
+
 #############
 # Functions #
 #############
 
 
-def add_column(table, name, val, fill=False):
+def first_row_only(value, length):
     """
-    Insert column with specified name and value at first row only.
+    Get the values of a column that only shows a value on its first row.
 
     Args:
-        table (pandas.core.frame.DataFrame): Dataframe of table to insert column into
-        name (str): Name of column
-        val (str): Value of column
-        fill (bool): Whether to fill column with value or leave it blank. Defaults to False
+        value: Value of the first row
+        length (int): Number of rows
 
     Returns:
-        table (pandas.core.frame.DataFrame): Dataframe with new column
+        values (list): Value followed by blanks
     """
-    if fill:
-        table.insert(0, name, val)
-    else:
-        table.insert(0, name, "")
-        table.at[0, name] = val
-    return table
+    return [value] + [""] * (length - 1)
+
+
+def get_header_fields(lines):
+    """
+    Get the invoice fields printed above the table, in one pass over the lines of
+    the first page.
+
+    Args:
+        lines (list): List of lines from PDF
+
+    Returns:
+        fields (dict): Invoice no., invoice date, order ref., subcon, zone and month
+    """
+    fields = {}
+    for line in lines:
+        # Get Invoice no.
+        if "INVOICE NO" in line.upper():
+            if "inv_no" in fields:
+                raise ValueError("Invoice no. found more than once!")
+            fields["inv_no"] = int(line.split(":")[-1].strip())
+
+        # Get Invoice date
+        if ("DATE" in line.upper()) and ("DUE" not in line.upper()):
+            if "inv_date" in fields:
+                raise ValueError("Invoice date found more than once!")
+            inv_date_str = line.split(":")[-1].strip()
+            date_object = datetime.strptime(inv_date_str, "%d-%b-%y")
+            fields["inv_date"] = date_object.strftime("%d-%b-%y")
+
+        # Get Order ref. no.
+        if "CUSTOMER ORDER REF" in line.upper():
+            if "order_ref" in fields:
+                raise ValueError("Order ref. found more than once!")
+            order_ref = line.split(":")[1].strip().split(" ")[0].strip()
+            fields["order_ref"] = order_ref
+
+            if "CSBP" in order_ref.upper():
+                subcon = "CSBP"
+                zone = "A"
+
+            elif "BBR" in order_ref.upper():
+                subcon = "BBR"
+                zone = "B"
+
+            elif "HCPL" in order_ref.upper():
+                subcon = "Hsuen Chow"
+                zone = ""
+
+            elif "CT" in order_ref.upper():
+                subcon = "CT"
+                zone = ""
+
+            elif "CLC" in order_ref.upper():
+                subcon = "CLC"
+                zone = ""
+
+            elif ("SCB" in order_ref.upper()) or ("SCE" in order_ref.upper()):
+                subcon = "SIONG"
+                zone = ""
+
+            else:
+                subcon = order_ref.upper()
+                zone = ""
+
+            fields["subcon"] = subcon
+            fields["zone"] = zone
+
+    missing = [name for name in ("inv_no", "inv_date", "order_ref") if name not in fields]
+    if missing:
+        raise ValueError(f"{', '.join(missing)} not found!")
+
+    # Get MMMM YY
+    fields["month"] = pd.to_datetime(fields["inv_date"]).strftime("%Y %m")
+
+    return fields
+
+
+def locate_stamp(img):
+    """
+    Locate the band of the scanned page that holds the stamp lines, with a quick
+    low-resolution pass, so that only that band is read at full resolution.
+
+    Args:
+        img (PIL.Image.Image): Grayscale scanned page
+
+    Returns:
+        box (tuple or None): (left, top, right, bottom) of the band across the
+        full page width, or None if a stamp line was not found
+    """
+    small = img.resize((int(img.width * locate_scale), int(img.height * locate_scale)))
+    regions = detect_text_regions(small) if region_ocr else None
+    document = build_page_document(small, regions)
+
+    lines = [document.find_lines(label) for label in stamp_labels]
+    if not all(lines):
+        return None
+    boxes = [line.box for label_lines in lines for line in label_lines]
+    top = max(int(min(box[1] for box in boxes) / locate_scale) - stamp_margin, 0)
+    bottom = min(int(max(box[3] for box in boxes) / locate_scale) + stamp_margin, img.height)
+    return 0, top, img.width, bottom
 
 
 def get_scanned_data(file_path, page_no):
@@ -55,30 +210,45 @@ def get_scanned_data(file_path, page_no):
 
     Args:
         file_path (str): Path to PDF file
-        page_no (int): Page number of PDF file
+        page_no (int): Page number of the page with the total, the scanned page follows it
 
     Returns:
         date_req (str): Date required
         location (str): Location of site
     """
-    images = convert_from_path(file_path, poppler_path=poppler_path)
+    # Render only the scanned page, which follows the page with the total
+    image = render_page_cached(file_path, page_no + 1)
+    if image is None:
+        raise ValueError("Scanned page not found!")
 
     # Convert image to grayscale
-    img = images[page_no].convert("L")
+    img = image.convert("L")
 
-    # Perform OCR using pytesseract
-    text = pytesseract.image_to_string(img)
-    lines = text.split("\n")
+    # Read only the band with the stamp lines if it can be located, else the whole page
+    box = locate_stamp(img) if stamp_crop else None
+    if box is not None:
+        img = img.crop(box)
+
+    # Perform OCR using pytesseract, on the text regions only if enabled
+    regions = detect_text_regions(img) if region_ocr else None
+    document = build_page_document(img, regions)
 
     # Get date required and location
     date_req = None
     location = None
-    for line in lines:
+    for ocr_line in document.lines:
+        line = ocr_line.text
+
         # Get date required
         if "DATE REQUIRED" in line.upper():
             loc = line.find("/")
             date_req = line[loc - 2 : loc + 8]
 
+            # Re-read the date from its crop if it is unreadable
+            if loc == -1:
+                date_match = read_field(document, "DATE REQUIRED", date_req_pattern)
+                date_req = date_match.group("date_req") if date_match else None
+
         # Get project location
         if "PART OF JOB" in line.upper():
             pattern = r"PART OF JOB\s*:?\s*(.*)"
@@ -95,147 +265,205 @@ def get_scanned_data(file_path, page_no):
     return date_req, location
 
 
-def get_table(file_path):
+def find_item_tables(page_tables):
     """
-    Get table from PDF.
+    Find the item tables among the tables of each page, up to the page with the total.
 
     Args:
-        file_path (str): Path to PDF file
+        page_tables (dict): Lists of tables, keyed by page number starting from 1
 
     Returns:
-        table (pandas.core.frame.DataFrame): Dataframe of table
+        item_tables (list[pandas.core.frame.DataFrame]): Item table of each page
+        page_no (int): Page number of the page with the total
     """
     # Initialize variables
     page_no = 1
     found_total = False
-    table = pd.DataFrame()
-    table_list = tabula.read_pdf(file_path, pages=page_no)
+    item_tables = []
+    table_list = page_tables[page_no]
 
     # Loop through pages to find page with total SGD
     while not found_total:
         if len(table_list) == 2:
-            table = pd.concat([table, table_list[0]], ignore_index=True)
+            item_tables.append(table_list[0])
             found_total = True
         elif len(table_list[0].columns) != 9:
             found_total = True
         else:
-            table = pd.concat([table, table_list[0]], ignore_index=True)
+            item_tables.append(table_list[0])
             page_no += 1
-            table_list = tabula.read_pdf(file_path, pages=page_no)
+            table_list = page_tables[page_no]
 
-    # Drop unwanted columns
-    drop = ["IT", "DISC."]
-    table.drop(drop, axis=1, inplace=True)
+    return item_tables, page_no
 
-    # Get data from scanned portion of PDF
-    date_req, location = get_scanned_data(file_path, page_no)
-    if (date_req is not None) and (date_req.strip() != ""):
-        date_req_object = datetime.strptime(date_req, "%d/%m/%Y")
-        date_req = date_req_object.strftime("%d-%b-%y")
-    table = add_column(table, "DATE REQ.", date_req, fill=True)
-    table = add_column(table, "LOCATION", location, fill=True)
 
-    # Replace values
-    table.replace(to_replace=r"\r", value=" ", regex=True, inplace=True)
-    table.replace(to_replace=",", value="", regex=True, inplace=True)
+def find_hinted_item_tables(page_tables):
+    """
+    Find the item tables among the tables read with the layout hints, up to the
+    page with the total. The hinted areas do not split the tables the way guessing
+    does, so the item table of a page is the first table with the item columns,
+    and the page with the total is the first with a total row in its item table,
+    which is cut off, or with a table besides it.
 
-    # Rename columns
-    subtotal_header = "$ AMOUNT"
-    if subtotal_header not in table.columns:
-        subtotal_header = "AMOUNT IN SGD"
-    table.rename(
-        columns={
-            "UNIT PRICE": "VENDOR INVOICE UNIT PRICE (S$)",
-            subtotal_header: "PDF SUBTOTAL",
-        },
-        inplace=True,
-    )
-    table["PDF SUBTOTAL"] = table["PDF SUBTOTAL"].astype("float64")
+    Args:
+        page_tables (dict): Lists of tables, keyed by page number starting from 1
 
-    # Get total amount from sum of subtotals
-    total = sum(table["PDF SUBTOTAL"])
-    table = add_column(table, "TOTAL AMT", total, fill=False)
+    Returns:
+        item_tables (list[pandas.core.frame.DataFrame]): Item table of each page
+        page_no (int): Page number of the page with the total
+    """
+    item_tables = []
+    for page_no in sorted(page_tables):
+        tables = page_tables[page_no]
+        items = next((table for table in tables if {"DO/NO", "QTY"}.issubset(table.columns)), None)
+        if items is None:
+            break
 
-    # Fill in blank values in DO/NO and convert to integer
-    table["DO/NO"] = table["DO/NO"].ffill()
-    table["DO/NO"] = table["DO/NO"].astype(int)
+        # The total row has no quantity, and rows from it on are totals rather than items
+        total_rows = items["QTY"].isna() & items.apply(lambda row: bool(total_pattern.search(" ".join(map(str, row)))), axis=1)
+        if total_rows.any():
+            item_tables.append(items[: int(total_rows.values.argmax())])
+            return item_tables, page_no
 
-    # Convert QTY to 6 d.p.
-    table["QTY"] = table["QTY"].astype("float64")
-    table.loc[table["QTY"] != "", "QTY"] = pd.to_numeric(
-        table.loc[table["QTY"] != "", "QTY"], errors="coerce"
-    ).round(6)
+        item_tables.append(items)
+        if len(tables) > 1:
+            return item_tables, page_no
 
-    return table
+    raise ValueError("Total not found!")
 
 
-def complete_table(table, lines):
+def valid_item_tables(item_tables, page_no, page_tables):
     """
-    Complete table with all other required variables.
+    Check that the item tables read with the layout hints look right: every item
+    table has the item columns, and no tables follow the page with the total.
 
     Args:
-        table (pandas.core.frame.DataFrame): Dataframe of table
-        lines (list): List of lines from PDF
+        item_tables (list[pandas.core.frame.DataFrame]): Item table of each page
+        page_no (int): Page number of the page with the total
+        page_tables (dict): Lists of tables, keyed by page number starting from 1
 
     Returns:
-        table (pandas.core.frame.DataFrame): Dataframe of table with all other required variables
+        valid (bool): Whether the item tables can be used
     """
-    for i, _ in enumerate(lines):
-        # Get Invoice no.
-        if "INVOICE NO" in lines[i].upper():
-            inv_no = int(lines[i].split(":")[-1].strip())
-            table = add_column(table, "INVOICE NO. 1", inv_no, fill=False)
-            table = add_column(table, "INVOICE NO. 2", inv_no, fill=True)
+    if not item_tables:
+        return False
+    for table in item_tables:
+        if not {"DO/NO", "QTY"}.issubset(table.columns):
+            return False
+        if "$ AMOUNT" not in table.columns and "AMOUNT IN SGD" not in table.columns:
+            return False
+    return not any(tables for page, tables in page_tables.items() if page > page_no)
 
-        # Get Invoice date
-        if ("DATE" in lines[i].upper()) and ("DUE" not in lines[i].upper()):
-            inv_date_str = lines[i].split(":")[-1].strip()
-            date_object = datetime.strptime(inv_date_str, "%d-%b-%y")
-            inv_date = date_object.strftime("%d-%b-%y")
-            table = add_column(table, "INVOICE DATE", inv_date, fill=False)
 
-        # Get Order ref. no.
-        if "CUSTOMER ORDER REF" in lines[i].upper():
-            order_ref = lines[i].split(":")[1].strip().split(" ")[0].strip()
-            table = add_column(table, "ORDER REF.", order_ref, fill=True)
+def get_tabula_item_tables(file_path):
+    """
+    Get the item tables with tabula, up to the page with the total. The layout
+    hints are used if calibrated, and tabula guesses the tables, reading the
+    pages again, only if the hinted tables are not valid.
 
-            if "CSBP" in order_ref.upper():
-                subcon = "CSBP"
-                zone = "A"
+    Args:
+        file_path (str): Path to PDF file
 
-            elif "BBR" in order_ref.upper():
-                subcon = "BBR"
-                zone = "B"
+    Returns:
+        item_tables (list[pandas.core.frame.DataFrame]): Item table of each page
+        page_no (int): Page number of the page with the total
+    """
+    hints = load_layout_hints(vendor_dir)
+    if hints is not None:
+        page_tables = read_page_tables(file_path, **hint_options(hints))
+        try:
+            item_tables, page_no = find_hinted_item_tables(page_tables)
+            if valid_item_tables(item_tables, page_no, page_tables):
+                return item_tables, page_no
+        except ValueError:
+            pass
 
-            elif "HCPL" in order_ref.upper():
-                subcon = "Hsuen Chow"
-                zone = ""
+    # Otherwise guess the tables, reading all pages at once
+    return find_item_tables(read_page_tables(file_path))
 
-            elif "CT" in order_ref.upper():
-                subcon = "CT"
-                zone = ""
 
-            elif "CLC" in order_ref.upper():
-                subcon = "CLC"
-                zone = ""
+def get_word_item_tables(file_path):
+    """
+    Get the item tables from the word boxes of the text layer, up to the page with the total.
 
-            elif ("SCB" in order_ref.upper()) or ("SCE" in order_ref.upper()):
-                subcon = "SIONG"
-                zone = ""
+    Args:
+        file_path (str): Path to PDF file
 
-            else:
-                subcon = order_ref.upper()
-                zone = ""
+    Returns:
+        item_tables (list[pandas.core.frame.DataFrame]): Item table of each page
+        page_no (int): Page number of the page with the total
+    """
+    page_tables, page_no = read_word_tables(file_path, word_headers, "QTY", total_pattern)
+    if page_no is None:
+        raise ValueError("Total not found!")
+    item_tables = [table.drop(columns=unused_columns) for page in range(1, page_no + 1) for table in page_tables[page]]
 
-            table = add_column(table, "ZONE", zone, fill=True)
-            table = add_column(table, "SUBCON", subcon, fill=True)
+    return item_tables, page_no
 
-    # Get MMMM YY
-    mmmm_yy = pd.to_datetime(inv_date).strftime("%Y %m")
-    table = add_column(table, "FOR MONTH (YYYY MM)", mmmm_yy, fill=True)
 
-    # Insert blank columns
-    table.insert(0, "CODE 1", "")
-    table.insert(0, "CODE 2", "")
+def get_table(file_path, fields):
+    """
+    Get table from PDF, built in its final column order.
+
+    Args:
+        file_path (str): Path to PDF file
+        fields (dict): Invoice fields from get_header_fields
+
+    Returns:
+        table (pandas.core.frame.DataFrame): Dataframe of table
+    """
+    # Get the item tables and the page with total SGD
+    if table_engine == "words":
+        item_tables, page_no = get_word_item_tables(file_path)
+    else:
+        item_tables, page_no = get_tabula_item_tables(file_path)
+    items = pd.concat(item_tables, ignore_index=True) if item_tables else pd.DataFrame()
+
+    # Replace values, in a single pass over the items
+    items = items.replace(to_replace=[r"\r", ","], value=[" ", ""], regex=True)
+
+    # Get data from scanned portion of PDF
+    date_req, location = get_scanned_data(file_path, page_no)
+    if (date_req is not None) and (date_req.strip() != ""):
+        date_req_object = datetime.strptime(date_req, "%d/%m/%Y")
+        date_req = date_req_object.strftime("%d-%b-%y")
+    if location is not None:
+        location = location.replace("\r", " ").replace(",", "")
+
+    # Get subtotals, and total amount from their sum
+    subtotal_header = "$ AMOUNT"
+    if subtotal_header not in items.columns:
+        subtotal_header = "AMOUNT IN SGD"
+    subtotal = items[subtotal_header].astype("float64")
+    total = sum(subtotal)
+
+    # Build the table in its final column order
+    length = len(items)
+    table = pd.DataFrame(
+        {
+            "INVOICE NO. 1": first_row_only(fields["inv_no"], length),
+            "INVOICE DATE": first_row_only(fields["inv_date"], length),
+            "TOTAL AMT": first_row_only(total, length),
+            "INVOICE NO. 2": fields["inv_no"],
+            "FOR MONTH (YYYY MM)": fields["month"],
+            "ZONE": fields["zone"],
+            "LOCATION": location,
+            "SUBCON": fields["subcon"],
+            "ORDER REF.": fields["order_ref"],
+            "DATE REQ.": date_req,
+            # Fill in blank values in DO/NO and convert to integer
+            "DO/NO": items["DO/NO"].ffill().astype(int),
+            "DESCRIPTION": items["DESCRIPTION"],
+            "CODE 1": "",
+            "CODE 2": "",
+            # Convert QTY to 6 d.p.
+            "QTY": items["QTY"].astype("float64").round(6),
+            "UNIT": items["UNIT"],
+            "VENDOR INVOICE UNIT PRICE (S$)": items["UNIT PRICE"],
+            "PER": items["PER"],
+            "PDF SUBTOTAL": subtotal,
+        },
+        index=items.index,
+    )
 
     return table
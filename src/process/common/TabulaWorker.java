@@ -0,0 +1,56 @@
+import java.io.BufferedReader;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.nio.charset.StandardCharsets;
+
+import com.google.gson.Gson;
+
+import org.apache.commons.cli.CommandLine;
+import org.apache.commons.cli.DefaultParser;
+
+import technology.tabula.CommandLineApp;
+
+/**
+ * Long-lived tabula-java process, so that the JVM is started once per batch
+ * instead of once per extraction.
+ *
+ * Reads one request per line on stdin: the tabula-java command line arguments
+ * as a JSON array of strings, with "--format JSON" and the PDF path last.
+ * Answers each request with one line on stdout: "OK", a tab and the extracted
+ * tables as single-line JSON, or "ERR", a tab and the error message.
+ *
+ * Compile and run with the tabula jar on the class path, e.g.
+ * javac -cp tabula-1.0.5-jar-with-dependencies.jar -d classes TabulaWorker.java
+ * java -cp classes:tabula-1.0.5-jar-with-dependencies.jar TabulaWorker
+ * or run the source directly with the source launcher of a Java 11 or later JDK.
+ */
+public class TabulaWorker {
+    public static void main(String[] args) throws Exception {
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        PrintStream out = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+
+        // Keep log output of the libraries from mixing with the answers
+        System.setOut(System.err);
+
+        out.println("READY");
+        Gson gson = new Gson();
+        String request;
+        while ((request = in.readLine()) != null) {
+            if (request.isEmpty()) {
+                continue;
+            }
+            try {
+                String[] arguments = gson.fromJson(request, String[].class);
+                CommandLine line = new DefaultParser().parse(CommandLineApp.buildOptions(), arguments);
+                StringBuilder tables = new StringBuilder();
+                new CommandLineApp(tables, line).extractTables(line);
+                // JSON output escapes line breaks inside strings, so only separators are dropped
+                out.println("OK\t" + tables.toString().replace("\r", "").replace("\n", ""));
+            } catch (Throwable e) {
+                out.println("ERR\t" + String.valueOf(e.getMessage()).replace("\r", " ").replace("\n", " "));
+            }
+        }
+    }
+}
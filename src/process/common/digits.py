@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import os
+import re
+import threading
+
+# Libs
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+##################
+# Configurations #
+##################
+
+# Load environment variables
+load_dotenv()
+cache_path = os.getenv('CACHE_PATH') or "./data/cache/"
+
+# File the harvested glyphs are kept in
+templates_path = os.path.join(cache_path, "digit_templates.npz")
+
+# Size glyphs are normalized to before matching, as (width, height) in pixels
+glyph_size = (16, 24)
+
+# Size of the closing applied so that the dots of dot-matrix glyphs join up, in pixels
+dot_gap = 3
+
+# Components shorter than this fraction of the tallest one are punctuation or noise
+min_glyph_height = 0.5
+
+# Typical width of a digit, as a fraction of its height
+glyph_aspect = 0.7
+
+# Gap between glyphs, as a fraction of the glyph height, read as a space
+space_gap = 0.5
+
+# Largest mean pixel difference to the nearest template for a glyph to be accepted
+max_glyph_distance = 0.15
+
+# Smallest lead of the nearest template over the nearest template of any other digit
+glyph_margin = 0.03
+
+# Templates each digit needs before a font is read without tesseract
+min_templates = 3
+
+# Templates kept per digit, the oldest are dropped first
+max_templates = 40
+
+# Harvested glyphs, keyed by font and then by digit, loaded on first use
+glyph_templates = None
+
+templates_lock = threading.Lock()
+
+#############
+# Functions #
+#############
+
+def segment_glyphs(image):
+    """
+    Split a single line of printed text into glyphs with connected components.
+
+    Args:
+        image (PIL.Image.Image): Crop of a single line of text
+
+    Returns:
+        ink (numpy.ndarray): Binary ink mask of the crop
+        boxes (list[tuple]): (left, top, right, bottom) of each glyph, from left to right
+    """
+    gray = np.array(image.convert("L"))
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    # Join the dots of dot-matrix glyphs before labelling them
+    joined = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, np.ones((dot_gap, dot_gap), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(joined)
+    if count < 2:
+        return ink, []
+
+    tallest = stats[1:, cv2.CC_STAT_HEIGHT].max()
+    boxes = []
+    for left, top, width, height, _ in stats[1:]:
+        if height >= min_glyph_height * tallest:
+            boxes.append([left, top, left + width, top + height])
+    boxes.sort()
+
+    # Parts of a broken glyph overlap horizontally, so merge them
+    merged = []
+    for box in boxes:
+        if merged and box[0] < merged[-1][2]:
+            last = merged[-1]
+            merged[-1] = [min(last[0], box[0]), min(last[1], box[1]), max(last[2], box[2]), max(last[3], box[3])]
+        else:
+            merged.append(box)
+
+    # Touching glyphs form one wide component, so split it evenly
+    glyphs = []
+    for left, top, right, bottom in merged:
+        parts = max(int(round((right - left) / (glyph_aspect * (bottom - top)))), 1)
+        step = (right - left) / parts
+        for k in range(parts):
+            glyphs.append((int(left + k * step), int(top), int(left + (k + 1) * step), int(bottom)))
+    return ink, glyphs
+
+
+def glyph_vector(ink, box):
+    """
+    Normalize a glyph to glyph_size, keeping its aspect ratio, as a flat vector.
+
+    Args:
+        ink (numpy.ndarray): Binary ink mask from segment_glyphs
+        box (tuple): (left, top, right, bottom) of the glyph
+
+    Returns:
+        vector (numpy.ndarray): Glyph pixels scaled to [0, 1]
+    """
+    left, top, right, bottom = box
+    glyph = ink[top:bottom, left:right]
+    width, height = glyph_size
+    scale = min(width / glyph.shape[1], height / glyph.shape[0])
+    resized = cv2.resize(
+        glyph, (max(int(glyph.shape[1] * scale), 1), max(int(glyph.shape[0] * scale), 1)),
+        interpolation=cv2.INTER_AREA,
+    )
+    canvas = np.zeros((height, width), np.float32)
+    x = (width - resized.shape[1]) // 2
+    y = (height - resized.shape[0]) // 2
+    canvas[y : y + resized.shape[0], x : x + resized.shape[1]] = resized / 255
+    return canvas.ravel()
+
+
+def load_templates():
+    """
+    Get the harvested glyphs, loading them from disk on first use. Must be called
+    with the lock held.
+
+    Returns:
+        templates (dict): Lists of glyph vectors, keyed by font and then by digit
+    """
+    global glyph_templates
+    if glyph_templates is None:
+        glyph_templates = {}
+        try:
+            with np.load(templates_path) as stored:
+                for key in stored.files:
+                    font, digit = key.rsplit("|", 1)
+                    glyph_templates.setdefault(font, {})[digit] = list(stored[key])
+        except (OSError, ValueError):
+            pass
+    return glyph_templates
+
+
+def recognize_digits(image, font):
+    """
+    Read a line of digits printed in a known font by matching each glyph against
+    the nearest harvested template. The line is only read when every glyph is
+    close to a template, and clearly closer to it than to the templates of any
+    other digit, so that a doubtful glyph is left to tesseract instead of
+    shortening the number.
+
+    Args:
+        image (PIL.Image.Image): Crop of a single line of text
+        font (str): Font the templates were harvested for, e.g. "SINMIX"
+
+    Returns:
+        text (str or None): Digits read, or None if the font is not trained yet or
+        a glyph was not recognized
+    """
+    with templates_lock:
+        templates = load_templates().get(font, {})
+        if any(len(templates.get(digit, [])) < min_templates for digit in "0123456789"):
+            return None
+        labels = np.array([digit for digit, vectors in templates.items() for _ in vectors])
+        matrix = np.stack([vector for vectors in templates.values() for vector in vectors])
+
+    ink, boxes = segment_glyphs(image)
+    if not boxes:
+        return None
+
+    median_height = np.median([bottom - top for _, top, _, bottom in boxes])
+    text = ""
+    for k, box in enumerate(boxes):
+        if k and box[0] - boxes[k - 1][2] > space_gap * median_height:
+            text += " "
+        distances = np.abs(matrix - glyph_vector(ink, box)).mean(axis=1)
+        nearest = int(np.argmin(distances))
+        digit = labels[nearest]
+        if distances[nearest] > max_glyph_distance or distances[labels != digit].min() - distances[nearest] < glyph_margin:
+            return None
+        text += digit
+    return text
+
+
+def harvest_digits(image, text, font):
+    """
+    Add the glyphs of a field that tesseract read with confidence to the templates
+    of its font. Nothing is added unless there is exactly one glyph per digit.
+
+    Args:
+        image (PIL.Image.Image): Crop the field was read from
+        text (str): Text of the field
+        font (str): Font the field is printed in, e.g. "SINMIX"
+    """
+    digits = re.sub(r"\D", "", text)
+    ink, boxes = segment_glyphs(image)
+    if not digits or len(boxes) != len(digits):
+        return
+
+    with templates_lock:
+        templates = load_templates().setdefault(font, {})
+        for digit, box in zip(digits, boxes):
+            vectors = templates.setdefault(digit, [])
+            vectors.append(glyph_vector(ink, box))
+            del vectors[:-max_templates]
+
+
+def save_templates():
+    """
+    Write the harvested glyphs to disk, replacing the previous file in one step.
+    """
+    with templates_lock:
+        if not glyph_templates:
+            return
+        os.makedirs(cache_path, exist_ok=True)
+        arrays = {
+            f"{font}|{digit}": np.stack(vectors)
+            for font, templates in glyph_templates.items()
+            for digit, vectors in templates.items()
+            if vectors
+        }
+        temp_path = f"{templates_path}.tmp.npz"
+        np.savez_compressed(temp_path, **arrays)
+        os.replace(temp_path, templates_path)
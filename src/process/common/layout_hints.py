@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import json
+import os
+import sys
+from collections import Counter
+
+# Libs
+import numpy as np
+
+# Custom
+from .tabula_worker import read_pdf_json
+
+##################
+# Configurations #
+##################
+
+# Name of the file the layout hints of a vendor are kept in, beside its module
+hints_file = "table_layout.json"
+
+# Margin added around each calibrated table area, in points
+area_margin = 5
+
+#############
+# Functions #
+#############
+
+def load_layout_hints(vendor_dir):
+    """
+    Load the layout hints of a vendor, if it was calibrated.
+
+    Args:
+        vendor_dir (str): Folder of the vendor module
+
+    Returns:
+        hints (dict or None): Table areas, column borders and extraction method, or None
+    """
+    try:
+        with open(os.path.join(vendor_dir, hints_file), "r") as hints_json:
+            return json.load(hints_json)
+    except (OSError, ValueError):
+        return None
+
+
+def hint_options(hints):
+    """
+    Get the tabula options that read tables with the layout hints instead of guessing.
+
+    Args:
+        hints (dict): Layout hints from load_layout_hints
+
+    Returns:
+        options (dict): Keyword arguments for read_page_tables
+    """
+    options = {"guess": False, "area": hints["area"]}
+    if hints.get("lattice"):
+        options["lattice"] = True
+    else:
+        options["stream"] = True
+        if hints.get("columns"):
+            options["columns"] = hints["columns"]
+    return options
+
+
+def calibrate_layout_hints(sample_paths, vendor_dir):
+    """
+    Calibrate the layout hints of a vendor from sample PDFs read with guessing,
+    and store them beside the vendor module. The areas are those of the tables
+    found, merged where they overlap. Column borders are only kept when there is
+    a single area, as tabula applies them to every area.
+
+    To calibrate a vendor, pick a few text-layer PDFs that cover its layouts,
+    including one with the item table spanning pages, and run from the
+    repository root, e.g.
+
+        python -m src.process.common.layout_hints src/process/brc sample1.pdf sample2.pdf
+
+    then process the samples with the vendor to check the results, and commit
+    the table_layout.json written beside the vendor module. Delete the file to
+    go back to guessing.
+
+    Args:
+        sample_paths (list): Paths to sample PDF files of the vendor
+        vendor_dir (str): Folder of the vendor module
+
+    Returns:
+        hints (dict): Layout hints that were stored
+    """
+    raw_tables = [
+        raw_table
+        for sample_path in sample_paths
+        for raw_table in read_pdf_json(sample_path, pages="all")
+        if raw_table["data"]
+    ]
+    if not raw_tables:
+        raise ValueError("No tables found in the samples!")
+
+    # Merge the boxes of the tables into areas, as [top, left, bottom, right]
+    areas = []
+    for raw_table in sorted(raw_tables, key=lambda raw_table: raw_table["top"]):
+        top, left = raw_table["top"], raw_table["left"]
+        box = [top, left, top + raw_table["height"], left + raw_table["width"]]
+        for area in areas:
+            if box[0] < area[2] and area[0] < box[2] and box[1] < area[3] and area[1] < box[3]:
+                area[:] = [min(area[0], box[0]), min(area[1], box[1]), max(area[2], box[2]), max(area[3], box[3])]
+                break
+        else:
+            areas.append(box)
+    areas = [
+        [max(top - area_margin, 0), max(left - area_margin, 0), bottom + area_margin, right + area_margin]
+        for top, left, bottom, right in areas
+    ]
+
+    method = Counter(raw_table["extraction_method"] for raw_table in raw_tables).most_common(1)[0][0]
+    hints = {"area": areas, "lattice": method == "lattice", "columns": None}
+
+    # Column borders are the median left edges of the cells, from rows with the usual number of cells
+    if method != "lattice" and len(areas) == 1:
+        rows = [row for raw_table in raw_tables for row in raw_table["data"]]
+        width = Counter(len(row) for row in rows).most_common(1)[0][0]
+        lefts = np.array([[cell["left"] for cell in row] for row in rows if len(row) == width and all(cell["width"] > 0 for cell in row)])
+        if len(lefts):
+            hints["columns"] = [float(left) for left in np.median(lefts, axis=0)[1:]]
+
+    with open(os.path.join(vendor_dir, hints_file), "w") as hints_json:
+        json.dump(hints, hints_json, indent=2)
+    return hints
+
+
+if __name__ == "__main__":
+    print(json.dumps(calibrate_layout_hints(sys.argv[2:], sys.argv[1]), indent=2))
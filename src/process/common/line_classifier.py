@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import re
+
+###########
+# Classes #
+###########
+
+class LineClassifier:
+    """
+    Classify lines of text by the keywords they contain, with one search of a
+    combined pattern over the uppercased line, so that each line is only run
+    through the patterns of the kinds it has.
+    """
+    def __init__(self, keywords):
+        """
+        Args:
+            keywords (dict): Pattern of the keyword of each kind, matched against the
+                uppercased line, e.g. {"sub_total": re.escape("SUB-TOTAL")}. Keywords
+                of different kinds must not overlap in a line.
+        """
+        self.pattern = re.compile("|".join(f"(?P<{kind}>{keyword})" for kind, keyword in keywords.items()))
+
+    def classify(self, line):
+        """
+        Get the kinds of a line.
+
+        Args:
+            line (str): Line of text
+
+        Returns:
+            kinds (set): Kinds whose keyword is in the line
+        """
+        return {match.lastgroup for match in self.pattern.finditer(line.upper())}
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import os
+
+# Libs
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+# Custom
+from ...config import tesseract_path
+
+##################
+# Configurations #
+##################
+
+pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+# Width of the downsampled page used to detect orientation and skew, in pixels
+detect_width = 1200
+
+# Largest skew corrected, and the step between tested angles, in degrees
+max_skew = 5.0
+skew_step = 0.25
+
+# Size of the adaptive threshold neighbourhood, as a fraction of the page width
+threshold_block = 1 / 40
+
+# Constant subtracted from the neighbourhood mean by the adaptive threshold
+threshold_offset = 15
+
+# Rotation and skew detected for each page, keyed by page_key
+page_geometry = {}
+
+# Whether to reuse the rotation found on earlier pages of a file, instead of running OSD on every
+# page. Off by default, as a page turned by 180 degrees has its lines running the same way as the rest
+reuse_rotation = False
+
+# Mean OCR confidence below which a page turned by a reused rotation is checked by OSD again,
+# as upside-down text reads with a much lower confidence
+min_reuse_confidence = 60
+
+# Rotation found for each file, keyed by path and modification time
+file_rotations = {}
+
+#############
+# Functions #
+#############
+
+def page_key(file_path, page_index, dpi):
+    """
+    Get the key identifying a rendered page in the geometry cache.
+
+    Args:
+        file_path (str): Path to PDF file
+        page_index (int): Index of the page, starting from 0
+        dpi (int): DPI the page was rendered at
+
+    Returns:
+        key (tuple): Key of the page
+    """
+    return os.path.abspath(file_path), os.path.getmtime(file_path), page_index, dpi
+
+
+def downsample(gray):
+    """
+    Downsample a grayscale page to the detection width.
+
+    Args:
+        gray (numpy.ndarray): Grayscale page
+
+    Returns:
+        small (numpy.ndarray): Downsampled page, or the page itself if already small
+    """
+    scale = detect_width / gray.shape[1]
+    if scale >= 1:
+        return gray
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def is_sideways(small):
+    """
+    Tell whether the text lines of a page run vertically, by comparing its row and
+    column projection profiles.
+
+    Args:
+        small (numpy.ndarray): Downsampled grayscale page
+
+    Returns:
+        sideways (bool): Whether the page is rotated by 90 or 270 degrees
+    """
+    # Text lines make the row profile of an upright page much spikier than its column profile
+    _, ink = cv2.threshold(small, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    ys, xs = np.nonzero(ink)
+    if ys.size == 0:
+        return False
+    ink = ink[ys.min() : ys.max() + 1, xs.min() : xs.max() + 1]
+    rows = ink.sum(axis=1, dtype=np.float64)
+    columns = ink.sum(axis=0, dtype=np.float64)
+    row_spread = np.var(rows) / np.mean(rows) ** 2
+    column_spread = np.var(columns) / np.mean(columns) ** 2
+    return column_spread > 1.5 * row_spread
+
+
+def ocr_confidence(small):
+    """
+    Get the mean tesseract word confidence of a page, which drops sharply when the
+    page is upside down.
+
+    Args:
+        small (numpy.ndarray): Downsampled grayscale page
+
+    Returns:
+        conf (float): Mean word confidence, or -1 if nothing was read
+    """
+    data = pytesseract.image_to_data(Image.fromarray(small), config="--psm 6", output_type=pytesseract.Output.DICT)
+    confs = [float(conf) for conf, text in zip(data["conf"], data["text"]) if text.strip() and float(conf) >= 0]
+    return float(np.mean(confs)) if confs else -1
+
+
+def detect_orientation(small):
+    """
+    Detect how far a page must be rotated clockwise to be upright, using tesseract
+    OSD. If OSD fails, the projection profiles tell upright pages from sideways
+    ones, and an upside-down read is told apart by its lower OCR confidence.
+
+    Args:
+        small (numpy.ndarray): Downsampled grayscale page
+
+    Returns:
+        rotation (int): Clockwise rotation in degrees, one of 0, 90, 180 or 270
+    """
+    try:
+        osd = pytesseract.image_to_osd(Image.fromarray(small), output_type=pytesseract.Output.DICT)
+        return int(osd["rotate"]) % 360
+    except pytesseract.TesseractError:
+        pass
+
+    rotation = 90 if is_sideways(small) else 0
+    flipped = (rotation + 180) % 360
+    if ocr_confidence(straighten(small, flipped, 0)) > ocr_confidence(straighten(small, rotation, 0)):
+        return flipped
+    return rotation
+
+
+def detect_skew(small):
+    """
+    Detect the skew of an upright page, as the angle that makes its row
+    projection profile the spikiest.
+
+    Args:
+        small (numpy.ndarray): Downsampled grayscale page
+
+    Returns:
+        skew (float): Counterclockwise rotation in degrees that straightens the page
+    """
+    _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    height, width = ink.shape
+    centre = (width / 2, height / 2)
+
+    best_angle, best_score = 0.0, -1
+    for angle in np.arange(-max_skew, max_skew + skew_step, skew_step):
+        matrix = cv2.getRotationMatrix2D(centre, angle, 1.0)
+        rotated = cv2.warpAffine(ink, matrix, (width, height), flags=cv2.INTER_NEAREST)
+        score = np.var(rotated.sum(axis=1, dtype=np.int64))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def straighten(gray, rotation, skew):
+    """
+    Rotate a page upright and remove its skew.
+
+    Args:
+        gray (numpy.ndarray): Grayscale page
+        rotation (int): Clockwise rotation in degrees, one of 0, 90, 180 or 270
+        skew (float): Counterclockwise rotation in degrees
+
+    Returns:
+        straight (numpy.ndarray): Straightened grayscale page
+    """
+    if rotation:
+        gray = np.ascontiguousarray(np.rot90(gray, k=-(rotation // 90)))
+
+    if skew:
+        height, width = gray.shape
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), skew, 1.0)
+        gray = cv2.warpAffine(
+            gray, matrix, (width, height), flags=cv2.INTER_LINEAR,
+            borderMode=cv2.BORDER_CONSTANT, borderValue=255,
+        )
+    return gray
+
+
+def normalize_page(image, key=None, binarize=True):
+    """
+    Normalize a scanned page before OCR: fix its orientation, remove its skew, and
+    binarise it with a local adaptive threshold that copes with uneven lighting.
+    The detected rotation and skew are cached per page. When reuse_rotation is on,
+    the rotation of the file is reused for later pages, unless they come out
+    sideways or read with a low OCR confidence, in which case OSD is run again.
+
+    Args:
+        image (PIL.Image.Image): Rendered page
+        key (tuple): Optional. Key of the page from page_key, to cache its geometry
+        binarize (bool): Optional. Whether to binarise the page. Defaults to True
+
+    Returns:
+        normalized (PIL.Image.Image): Normalized grayscale or binarised page
+    """
+    gray = np.array(image.convert("L"))
+
+    # Detect the page geometry, unless it was already detected for this page
+    geometry = page_geometry.get(key) if key is not None else None
+    if geometry is None:
+        small = downsample(gray)
+        rotation = file_rotations.get(key[:2]) if reuse_rotation and key is not None else None
+        if rotation is not None:
+            reused = straighten(small, rotation, 0)
+            if is_sideways(reused) or ocr_confidence(reused) < min_reuse_confidence:
+                rotation = None
+        if rotation is None:
+            rotation = detect_orientation(small)
+            if key is not None:
+                file_rotations[key[:2]] = rotation
+        skew = detect_skew(downsample(straighten(gray, rotation, 0)))
+        geometry = (rotation, skew)
+        if key is not None:
+            page_geometry[key] = geometry
+
+    gray = straighten(gray, *geometry)
+
+    if binarize:
+        block_size = int(gray.shape[1] * threshold_block) | 1
+        gray = cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block_size, threshold_offset,
+        )
+
+    return Image.fromarray(gray)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+# Libs
+import pytesseract
+import streamlit as st
+
+# Custom
+from .regions import detect_text_regions, region_psm
+from .tiling import keep_owned_lines, split_into_bands, tile_min_pixels, tile_workers
+from ...config import tesseract_path
+
+##################
+# Configurations #
+##################
+
+pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+# Characters allowed when re-reading numeric fields (DO numbers, amounts, dates)
+numeric_whitelist = "0123456789./,-"
+
+# Padding added around a crop before it is re-read, in pixels
+crop_padding = 10
+
+###########
+# Classes #
+###########
+
+class OcrWord(NamedTuple):
+    """
+    A single word read by tesseract, with its bounding box in page coordinates.
+    """
+    text: str
+    conf: float
+    left: int
+    top: int
+    right: int
+    bottom: int
+
+
+class OcrLine:
+    """
+    A line of words, in reading order.
+    """
+    def __init__(self, words):
+        self.words = words
+
+    @property
+    def text(self):
+        return " ".join(word.text for word in self.words)
+
+    @property
+    def box(self):
+        return (
+            min(word.left for word in self.words),
+            min(word.top for word in self.words),
+            max(word.right for word in self.words),
+            max(word.bottom for word in self.words),
+        )
+
+    @property
+    def conf(self):
+        return min(word.conf for word in self.words)
+
+    def conf_of(self, span):
+        """
+        Get the confidence of the words covering part of the line text.
+
+        Args:
+            span (tuple): (start, end) character offsets in the line text
+
+        Returns:
+            conf (float): Lowest confidence of the words overlapping the span
+        """
+        confs = []
+        start = 0
+        for word in self.words:
+            end = start + len(word.text)
+            if start < span[1] and end > span[0]:
+                confs.append(word.conf)
+            start = end + 1
+        return min(confs) if confs else self.conf
+
+    def box_after(self, keyword):
+        """
+        Get the bounding box of the part of the line that follows a keyword.
+
+        Args:
+            keyword (str): Label printed before the value, e.g. "REFERENCE NO"
+
+        Returns:
+            box (tuple): (left, top, right, bottom) of the value part of the line
+        """
+        left, top, right, bottom = self.box
+        for k, word in enumerate(self.words):
+            if keyword.upper() in " ".join(w.text for w in self.words[: k + 1]).upper():
+                # Keep the word itself if the value is glued to the label
+                left = word.left if re.search(r"\d", word.text) else word.right
+                break
+        return left, top, right, bottom
+
+
+class PageDocument:
+    """
+    Words and lines read from a page in a single tesseract pass, together with
+    the page image so that individual fields can be re-read when needed.
+    """
+    def __init__(self, image, lines):
+        self.image = image
+        self.lines = lines
+
+    @property
+    def text(self):
+        return "\n".join(line.text for line in self.lines)
+
+    def find_lines(self, keyword):
+        """
+        Get all lines containing a keyword, ignoring case.
+
+        Args:
+            keyword (str): Keyword to look for
+
+        Returns:
+            lines (list[OcrLine]): Lines containing the keyword
+        """
+        return [line for line in self.lines if keyword.upper() in line.text.upper()]
+
+    def crop(self, box):
+        """
+        Crop a padded box out of the page image.
+
+        Args:
+            box (tuple): (left, top, right, bottom) in page coordinates
+
+        Returns:
+            crop (PIL.Image.Image): Cropped image
+        """
+        left, top, right, bottom = box
+        return self.image.crop((
+            max(left - crop_padding, 0),
+            max(top - crop_padding, 0),
+            min(right + crop_padding, self.image.width),
+            min(bottom + crop_padding, self.image.height),
+        ))
+
+
+#############
+# Functions #
+#############
+
+def read_lines(image, config="", offset=(0, 0), key=()):
+    """
+    Perform OCR on an image with image_to_data and group the words into lines.
+
+    Args:
+        image (PIL.Image.Image): Image to read
+        config (str): Optional. Extra tesseract configuration
+        offset (tuple): Optional. (left, top) of the image on the page
+        key (tuple): Optional. Prefix keeping lines of different images apart
+
+    Returns:
+        lines (dict): Dictionary of line keys and their list of words
+    """
+    data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+
+    lines = {}
+    for i, text in enumerate(data["text"]):
+        # Skip page, block and paragraph entries, as well as empty words
+        if int(data["level"][i]) != 5 or not text.strip():
+            continue
+
+        left = int(data["left"][i]) + offset[0]
+        top = int(data["top"][i]) + offset[1]
+        word = OcrWord(
+            text=text.strip(),
+            conf=float(data["conf"][i]),
+            left=left,
+            top=top,
+            right=left + int(data["width"][i]),
+            bottom=top + int(data["height"][i]),
+        )
+        line_key = key + (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(line_key, []).append(word)
+
+    return lines
+
+
+def read_tiled(image, config=""):
+    """
+    Perform OCR on an oversized page by reading overlapping horizontal bands
+    concurrently, then stitching their lines back together in order.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+        config (str): Optional. Extra tesseract configuration
+
+    Returns:
+        lines (dict): Dictionary of line keys and their list of words
+    """
+    bands = split_into_bands(image)
+
+    def read_band(index):
+        read_top, read_bottom, own_top, own_bottom = bands[index]
+        crop = image.crop((0, read_top, image.width, read_bottom))
+        band_lines = read_lines(crop, config=config, offset=(0, read_top), key=(index,))
+        return keep_owned_lines(band_lines, own_top, own_bottom)
+
+    lines = {}
+    with ThreadPoolExecutor(max_workers=tile_workers) as executor:
+        for band_lines in executor.map(read_band, range(len(bands))):
+            lines.update(band_lines)
+    return lines
+
+
+def build_page_document(image, regions=None):
+    """
+    Build the document model of a page from one image_to_data pass, either over
+    the given text regions, over bands of an oversized page, or over the whole page.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+        regions (list[tuple]): Optional. List of (kind, box) from detect_text_regions
+
+    Returns:
+        document (PageDocument): Words and lines read from the page
+    """
+    if regions:
+        def read_region(index):
+            kind, box = regions[index]
+            config = f"--psm {region_psm[kind]}"
+            return read_lines(image.crop(box), config=config, offset=box[:2], key=(index,))
+
+        # Read the regions concurrently, keeping them in reading order
+        lines = {}
+        with ThreadPoolExecutor(max_workers=tile_workers) as executor:
+            for region_lines in executor.map(read_region, range(len(regions))):
+                lines.update(region_lines)
+
+    elif image.width * image.height > tile_min_pixels:
+        lines = read_tiled(image)
+
+    else:
+        lines = read_lines(image)
+
+    return PageDocument(image, [OcrLine(words) for words in lines.values()])
+
+
+def get_page_document(image, region_ocr=False):
+    """
+    Builds the document model of a page with a single OCR pass.
+
+    Args:
+        image (PIL.Image.Image): A binarized image containing the text to be processed.
+        region_ocr (bool): Optional. Whether to OCR the detected text regions only. Defaults to False
+
+    Returns:
+        document (PageDocument): Words and lines read from the page
+    """
+    # Perform OCR using pytesseract, on the text regions only if enabled
+    regions = detect_text_regions(image) if region_ocr else None
+    return build_page_document(image, regions)
+
+
+def report_doubtful_pages(file_path, doubtful_pages):
+    """
+    Report the pages whose subtotal was read with low confidence, as they decide
+    where each DO ends.
+
+    Args:
+        file_path (str): The path to the PDF file
+        doubtful_pages (list[int]): Page numbers, starting from 1, with a doubtful subtotal
+    """
+    if doubtful_pages:
+        filename = os.path.basename(file_path)
+        pages = ", ".join(str(page) for page in doubtful_pages)
+        st.write(f"Low-confidence subtotal in {filename} on page {pages}, please check the DOs there.")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import json
+import os
+import tempfile
+
+# Libs
+import numpy as np
+import pandas as pd
+import tabula
+from PyPDF2 import PdfReader, PdfWriter
+
+# Custom
+from . import tabula_worker
+
+#############
+# Functions #
+#############
+
+def tables_from_json(raw_tables):
+    """
+    Convert tables from tabula-java JSON output into dataframes, the same way
+    tabula.read_pdf does by default: the first row is the header, empty cells
+    are NaN and numeric columns are converted.
+
+    Args:
+        raw_tables (list): Decoded tabula-java JSON output
+
+    Returns:
+        tables (list[pandas.core.frame.DataFrame]): List of tables
+    """
+    tables = []
+    for raw_table in raw_tables:
+        if not raw_table["data"]:
+            continue
+        rows = [[cell["text"] or np.nan for cell in row] for row in raw_table["data"]]
+
+        # Name blank headers "Unnamed: k" and suffix duplicate headers ".1", ".2"...
+        columns = rows.pop(0)
+        unnamed = 0
+        for k, column in enumerate(columns):
+            if column is np.nan:
+                columns[k] = f"Unnamed: {unnamed}"
+                unnamed += 1
+        counts = {}
+        for k, column in enumerate(columns):
+            count = counts.get(column, 0)
+            while count > 0:
+                counts[column] = count + 1
+                column = f"{column}.{count}"
+                count = counts.get(column, 0)
+            columns[k] = column
+            counts[column] = count + 1
+
+        table = pd.DataFrame(rows, columns=columns)
+        for column in table.columns:
+            try:
+                table[column] = pd.to_numeric(table[column])
+            except (ValueError, TypeError):
+                pass
+        tables.append(table)
+    return tables
+
+
+def read_page_tables(file_path, **options):
+    """
+    Read the tables of every page of a PDF without starting a JVM per page. Pages
+    are read one by one with the long-lived tabula workers when they are available.
+    Otherwise the pages are split into single-page files and read with tabula's
+    batch mode, so that one JVM serves the whole document.
+
+    Args:
+        file_path (str): Path to PDF file
+        **options: Other tabula options, e.g. the layout hints from hint_options
+
+    Returns:
+        page_tables (dict): Lists of tables, keyed by page number starting from 1
+    """
+    reader = PdfReader(file_path)
+    if tabula_worker.use_worker:
+        page_tables = {}
+        for page_number in range(1, len(reader.pages) + 1):
+            if tabula_worker.workers_unavailable:
+                break
+            page_tables[page_number] = tables_from_json(tabula_worker.read_pdf_json(file_path, pages=page_number, **options))
+        else:
+            return page_tables
+
+    with tempfile.TemporaryDirectory() as page_dir:
+        for page_number, page in enumerate(reader.pages, start=1):
+            writer = PdfWriter()
+            writer.add_page(page)
+            with open(os.path.join(page_dir, f"{page_number:05d}.pdf"), "wb") as page_file:
+                writer.write(page_file)
+
+        tabula.convert_into_by_batch(page_dir, output_format="json", pages="all", **options)
+
+        page_tables = {}
+        for page_number in range(1, len(reader.pages) + 1):
+            json_path = os.path.join(page_dir, f"{page_number:05d}.json")
+            try:
+                with open(json_path, "r", encoding="utf-8") as json_file:
+                    page_tables[page_number] = tables_from_json(json.load(json_file))
+            except (OSError, ValueError):
+                page_tables[page_number] = []
+    return page_tables
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import json
+import os
+import re
+import threading
+
+# Libs
+from dotenv import load_dotenv
+
+##################
+# Configurations #
+##################
+
+# Load environment variables
+load_dotenv()
+cache_path = os.getenv('CACHE_PATH') or "./data/cache/"
+
+# File the recipe stats are kept in, outside of the upload and output folders that are cleared
+stats_path = os.path.join(cache_path, "recipe_stats.json")
+
+# Number of successes of each recipe, keyed by source and then by recipe, loaded on first use
+recipe_stats = None
+
+stats_lock = threading.Lock()
+
+#############
+# Functions #
+#############
+
+def source_key(vendor, pdf_path, reader):
+    """
+    Get the key identifying where a PDF comes from, so that files from the same
+    batch plant or scanner share their stats. The PDF producer is used when known,
+    otherwise the file name with its numbers masked out.
+
+    Args:
+        vendor (str): Processing option, e.g. "SINMIX"
+        pdf_path (str): Path to the PDF file
+        reader (PyPDF2.PdfReader): Reader of the PDF file
+
+    Returns:
+        source (str): Key of the source
+    """
+    metadata = reader.metadata or {}
+    producer = metadata.get("/Producer") or metadata.get("/Creator")
+    if producer:
+        return f"{vendor}|producer:{producer}"
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return f"{vendor}|name:{re.sub(r'[0-9]+', '#', stem)}"
+
+
+def load_stats():
+    """
+    Get the recipe stats, loading them from disk on first use.
+
+    Returns:
+        stats (dict): Number of successes of each recipe, keyed by source and then by recipe
+    """
+    global recipe_stats
+    if recipe_stats is None:
+        try:
+            with open(stats_path, "r") as stats_file:
+                recipe_stats = json.load(stats_file)
+        except (OSError, ValueError):
+            recipe_stats = {}
+    return recipe_stats
+
+
+def rank_recipes(source, recipes):
+    """
+    Order recipes by how often they succeeded for a source, keeping the given order for ties.
+
+    Args:
+        source (str): Key of the source from source_key
+        recipes (iterable): Recipes to order, e.g. contrast values
+
+    Returns:
+        ranked (list): Recipes, most successful first
+    """
+    with stats_lock:
+        counts = load_stats().get(source, {})
+        return sorted(recipes, key=lambda recipe: -counts.get(str(recipe), 0))
+
+
+def record_success(source, recipe):
+    """
+    Record that a recipe succeeded for a source.
+
+    Args:
+        source (str): Key of the source from source_key
+        recipe: Recipe that succeeded, e.g. a contrast value
+    """
+    with stats_lock:
+        counts = load_stats().setdefault(source, {})
+        counts[str(recipe)] = counts.get(str(recipe), 0) + 1
+
+
+def save_stats():
+    """
+    Write the recipe stats to disk, replacing the previous file in one step.
+    """
+    with stats_lock:
+        if recipe_stats is None:
+            return
+        os.makedirs(cache_path, exist_ok=True)
+        temp_path = f"{stats_path}.tmp"
+        with open(temp_path, "w") as stats_file:
+            json.dump(recipe_stats, stats_file, indent=2, sort_keys=True)
+        os.replace(temp_path, stats_path)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Libs
+import cv2
+import numpy as np
+
+##################
+# Configurations #
+##################
+
+# Scale of the downsampled page used for detection
+region_scale = 0.25
+
+# Minimum area of a region on the downsampled page, in pixels
+min_region_area = 150
+
+# Padding added around each region at full resolution, in pixels
+region_padding = 20
+
+# Minimum share of ruling pixels for a region to count as a table zone
+table_line_ratio = 0.02
+
+# Page segmentation modes used for each kind of region
+region_psm = {
+    "line": 7,   # Single text line
+    "text": 6,   # Uniform block of text
+    "table": 6,  # Uniform block of text, keeps table rows on their own lines
+}
+
+#############
+# Functions #
+#############
+
+def find_rulings(ink):
+    """
+    Finds horizontal and vertical ruling lines on an inverted binary page.
+
+    Args:
+        ink (numpy.ndarray): Binary page where ink is white (255) and paper is black (0)
+
+    Returns:
+        rulings (numpy.ndarray): Binary mask of the ruling lines
+    """
+    height, width = ink.shape
+    h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(width // 20, 10), 1))
+    v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(height // 30, 10)))
+    h_lines = cv2.morphologyEx(ink, cv2.MORPH_OPEN, h_kernel)
+    v_lines = cv2.morphologyEx(ink, cv2.MORPH_OPEN, v_kernel)
+    return cv2.bitwise_or(h_lines, v_lines)
+
+
+def merge_into_bands(boxes):
+    """
+    Merges boxes that overlap vertically into full-width bands, so that labels
+    and values printed far apart on the same line stay in one region.
+
+    Args:
+        boxes (list[tuple]): List of (x, y, w, h) boxes
+
+    Returns:
+        bands (list[list]): List of [x0, y0, x1, y1] bands sorted from top to bottom
+    """
+    bands = []
+    for x, y, w, h in sorted(boxes, key=lambda box: box[1]):
+        if bands and y <= bands[-1][3]:
+            band = bands[-1]
+            band[0] = min(band[0], x)
+            band[2] = max(band[2], x + w)
+            band[3] = max(band[3], y + h)
+        else:
+            bands.append([x, y, x + w, y + h])
+    return bands
+
+
+def detect_text_regions(image, scale=region_scale):
+    """
+    Detects text regions and table zones on a downsampled copy of a page,
+    using morphological dilation and contour grouping.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+        scale (float): Optional. Scale of the downsampled page. Defaults to region_scale
+
+    Returns:
+        regions (list[tuple]): List of (kind, (left, top, right, bottom)) in full resolution
+        coordinates and reading order, where kind is "line", "text" or "table"
+    """
+    page = np.array(image.convert("L"))
+    page_height, page_width = page.shape
+
+    # Downsample and invert the page so that ink is white
+    small = cv2.resize(page, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    _, ink = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+
+    # Find the table rulings, then smear words into blocks
+    rulings = find_rulings(ink)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 3))
+    blocks = cv2.dilate(ink, kernel, iterations=2)
+
+    # Group the blocks into contours and keep the sizeable ones
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = [cv2.boundingRect(c) for c in contours]
+    boxes = [box for box in boxes if box[2] * box[3] >= min_region_area]
+
+    # Most blocks are single lines, so their median height tells a line from a paragraph
+    line_height = np.median([box[3] for box in boxes]) if boxes else 0
+
+    # Classify each band and map it back to full resolution
+    regions = []
+    for x0, y0, x1, y1 in merge_into_bands(boxes):
+        ruling_ratio = np.count_nonzero(rulings[y0:y1, x0:x1]) / max((x1 - x0) * (y1 - y0), 1)
+        if ruling_ratio >= table_line_ratio:
+            kind = "table"
+        elif (y1 - y0) <= 1.5 * line_height:
+            kind = "line"
+        else:
+            kind = "text"
+
+        left = max(int(x0 / scale) - region_padding, 0)
+        top = max(int(y0 / scale) - region_padding, 0)
+        right = min(int(x1 / scale) + region_padding, page_width)
+        bottom = min(int(y1 / scale) + region_padding, page_height)
+        regions.append((kind, (left, top, right, bottom)))
+
+    return regions
+
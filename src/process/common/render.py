@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import os
+from collections import OrderedDict
+
+# Libs
+from pdf2image import convert_from_path
+
+# Custom
+from ...config import poppler_path
+
+##################
+# Configurations #
+##################
+
+# Number of renders kept by render_page_cached
+render_cache_size = 4
+
+# Renders kept by render_page_cached, least recently used first
+render_cache = OrderedDict()
+
+#############
+# Functions #
+#############
+
+def render_page(file_path, page_number, dpi=200):
+    """
+    Render a single page of a PDF.
+
+    Args:
+        file_path (str): Path to PDF file
+        page_number (int): Page number to render, starting from 1
+        dpi (int): Optional. DPI to render the page at. Defaults to 200
+
+    Returns:
+        image (PIL.Image.Image or None): Rendered page, or None if it could not be rendered
+    """
+    images = convert_from_path(
+        file_path, first_page=page_number, last_page=page_number, poppler_path=poppler_path, dpi=dpi,
+    )
+    return images[0] if images else None
+
+
+def render_page_cached(file_path, page_number, dpi=200):
+    """
+    Render a single page of a PDF, reusing the previous render if the same page
+    of the same file was rendered recently.
+
+    Args:
+        file_path (str): Path to PDF file
+        page_number (int): Page number to render, starting from 1
+        dpi (int): Optional. DPI to render the page at. Defaults to 200
+
+    Returns:
+        image (PIL.Image.Image or None): Rendered page, or None if it could not be rendered
+    """
+    key = (os.path.abspath(file_path), os.path.getmtime(file_path), page_number, dpi)
+    if key in render_cache:
+        render_cache.move_to_end(key)
+        return render_cache[key]
+
+    image = render_page(file_path, page_number, dpi=dpi)
+    if image is not None:
+        render_cache[key] = image
+        if len(render_cache) > render_cache_size:
+            render_cache.popitem(last=False)
+    return image
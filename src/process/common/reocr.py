@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import re
+from typing import NamedTuple, Optional
+
+# Libs
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+# Custom
+from .digits import harvest_digits, recognize_digits
+from .page_model import numeric_whitelist, read_lines
+from ...config import tesseract_path
+
+##################
+# Configurations #
+##################
+
+pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+# Fields read below this confidence are re-read with the recipes
+retry_confidence = 75
+
+# Fields still below this confidence after all recipes are dropped by read_field instead of guessed
+reject_confidence = 40
+
+###########
+# Classes #
+###########
+
+class OcrRecipe(NamedTuple):
+    """
+    Preprocessing and tesseract settings used to re-read a field.
+    """
+    contrast: float = 1.0            # Contrast factor, as in PIL.ImageEnhance.Contrast
+    threshold: Optional[str] = None  # None, "otsu" or "adaptive"
+    scale: float = 1.0               # Upsampling factor, in place of a higher DPI render
+    psm: int = 7                     # Page segmentation mode
+
+
+# Recipes tried in order on a low-confidence field
+default_recipes = (
+    OcrRecipe(),
+    OcrRecipe(threshold="otsu", scale=2.0),
+    OcrRecipe(contrast=2.0, threshold="adaptive"),
+    OcrRecipe(contrast=3.0, scale=2.0, psm=8),
+)
+
+#############
+# Functions #
+#############
+
+def adjust_contrast(gray, factor):
+    """
+    Adjust the contrast of a grayscale image with a lookup table. Gives the same
+    result as PIL.ImageEnhance.Contrast, without building intermediate images.
+
+    Args:
+        gray (numpy.ndarray): Grayscale image
+        factor (float): Contrast factor
+
+    Returns:
+        adjusted (numpy.ndarray): Grayscale image with adjusted contrast
+    """
+    mean = int(gray.mean() + 0.5)
+    lut = np.clip(mean + factor * (np.arange(256) - mean), 0, 255).astype(np.uint8)
+    return cv2.LUT(gray, lut)
+
+
+def apply_recipe(image, recipe):
+    """
+    Preprocess an image according to a recipe.
+
+    Args:
+        image (PIL.Image.Image): Image to preprocess
+        recipe (OcrRecipe): Recipe to apply
+
+    Returns:
+        processed (PIL.Image.Image): Preprocessed grayscale image
+    """
+    gray = np.array(image.convert("L"))
+
+    if recipe.contrast != 1:
+        gray = adjust_contrast(gray, recipe.contrast)
+
+    if recipe.scale != 1:
+        gray = cv2.resize(gray, None, fx=recipe.scale, fy=recipe.scale, interpolation=cv2.INTER_CUBIC)
+
+    if recipe.threshold == "otsu":
+        _, gray = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    elif recipe.threshold == "adaptive":
+        gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 15)
+
+    return Image.fromarray(gray)
+
+
+def read_crop(crop, recipe, whitelist=None):
+    """
+    Read a cropped field with a recipe.
+
+    Args:
+        crop (PIL.Image.Image): Cropped field
+        recipe (OcrRecipe): Recipe to read the field with
+        whitelist (str): Optional. Characters tesseract is allowed to output
+
+    Returns:
+        text (str): Text read from the crop
+        conf (float): Lowest word confidence, or -1 if nothing was read
+    """
+    config = f"--psm {recipe.psm}"
+    if whitelist:
+        config += f" -c tessedit_char_whitelist={whitelist}"
+
+    words = [word for line in read_lines(apply_recipe(crop, recipe), config=config).values() for word in line]
+    if not words:
+        return "", -1
+    return " ".join(word.text for word in words), min(word.conf for word in words)
+
+
+def read_field_with_conf(
+    document, keyword, pattern, upper=False, whitelist=numeric_whitelist, recipes=default_recipes, font=None
+):
+    """
+    Read a labelled field from a page, using tesseract word confidences to decide
+    whether it needs a retry. Only the value part of the labelled line is re-read,
+    with each recipe in turn, until the field matches with enough confidence.
+    Numeric fields printed in a known font are first matched against the glyphs
+    harvested from earlier confident reads. Values are returned however doubtful
+    they are, leaving the caller to decide what to do with them.
+
+    Args:
+        document (PageDocument): Document model of the page
+        keyword (str): Label printed before the field
+        pattern (re.Pattern or str): Pattern of the field
+        upper (bool): Optional. Whether to search the uppercased line. Defaults to False
+        whitelist (str): Optional. Characters allowed when re-reading. Defaults to numeric_whitelist
+        recipes (tuple[OcrRecipe]): Optional. Recipes to retry with. Defaults to default_recipes
+        font (str): Optional. Font of the field for the digit templates, e.g. "GW"
+
+    Returns:
+        match (re.Match or None): Match of the pattern, or None if not found
+        conf (float): Confidence of the match, retry_confidence if read from the templates,
+        or -1 if not found
+    """
+    lines = document.find_lines(keyword)
+    if not lines:
+        return None, -1
+
+    # Take the last match of the first read, as well as how sure tesseract was of it
+    best_match, best_conf, best_line = None, -1, lines[0]
+    for line in lines:
+        text = line.text.upper() if upper else line.text
+        match = re.search(pattern, text)
+        if match:
+            best_match, best_conf, best_line = match, line.conf_of(match.span()), line
+
+    # Re-read the value part of the line only when the first read is doubtful
+    crop = document.crop(best_line.box_after(keyword))
+    if best_conf < retry_confidence:
+        text = recognize_digits(crop, font) if font else None
+        match = re.search(pattern, f"{keyword} {text}") if text else None
+        if match:
+            return match, retry_confidence
+
+        for recipe in recipes:
+            text, conf = read_crop(crop, recipe, whitelist=whitelist)
+            match = re.search(pattern, f"{keyword} {text}")
+            if match and conf > best_conf:
+                best_match, best_conf = match, conf
+            if best_conf >= retry_confidence:
+                break
+
+    # Learn the glyphs of the font from confident reads
+    if font and best_conf >= retry_confidence:
+        harvest_digits(crop, best_match.group(0), font)
+
+    return best_match, best_conf
+
+
+def read_field(document, keyword, pattern, upper=False, whitelist=numeric_whitelist, recipes=default_recipes, font=None):
+    """
+    Read a labelled field from a page with read_field_with_conf, leaving values
+    still doubtful after all recipes empty rather than silently wrong. Fields whose
+    presence matters, such as the subtotal that ends a DO, should use
+    read_field_with_conf instead and report doubtful values.
+
+    Args:
+        document (PageDocument): Document model of the page
+        keyword (str): Label printed before the field
+        pattern (re.Pattern or str): Pattern of the field
+        upper (bool): Optional. Whether to search the uppercased line. Defaults to False
+        whitelist (str): Optional. Characters allowed when re-reading. Defaults to numeric_whitelist
+        recipes (tuple[OcrRecipe]): Optional. Recipes to retry with. Defaults to default_recipes
+        font (str): Optional. Font of the field for the digit templates, e.g. "GW"
+
+    Returns:
+        match (re.Match or None): Match of the pattern, or None if not found or not trusted
+    """
+    match, conf = read_field_with_conf(document, keyword, pattern, upper, whitelist, recipes, font)
+    if conf < reject_confidence:
+        return None
+    return match
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Libs
+import numpy as np
+import pandas as pd
+
+###########
+# Classes #
+###########
+
+class ResultAccumulator:
+    """
+    Collect the result rows of a vendor as lists of column values, and build the
+    final dataframe once, in its final column order. Adding rows costs the same
+    however many rows were added before, unlike concatenating dataframes.
+    Columns are kept as object, as text such as invoice and DO numbers must not
+    be turned into numbers, except those only ever added from numeric columns of
+    dataframes, which are numeric again as pd.concat keeps them.
+    """
+    def __init__(self, columns):
+        """
+        Args:
+            columns (list): Columns of the result, in order
+        """
+        self.columns = list(columns)
+        self.data = {column: [] for column in self.columns}
+        self.numeric = {}
+        self.length = 0
+
+    def add_rows(self, rows, dtypes=None):
+        """
+        Add rows given as column values. Columns not given are left empty, as NaN.
+
+        Args:
+            rows (dict): List of values of each column, all of the same length, or a
+                single value to repeat on every row
+            dtypes (dict): Optional. Dtype of each column the values come from, e.g.
+                df.dtypes. Columns without a numeric dtype are built as object.
+                Defaults to None
+        """
+        for column in rows:
+            dtype = dtypes.get(column) if dtypes is not None else None
+            numeric = dtype is not None and pd.api.types.is_numeric_dtype(dtype)
+            self.numeric[column] = self.numeric.get(column, True) and numeric
+
+        # Columns not seen before are added at the end, empty on earlier rows, as pd.concat does
+        for column in rows:
+            if column not in self.data:
+                self.columns.append(column)
+                self.data[column] = [np.nan] * self.length
+
+        length = max((len(values) for values in rows.values() if isinstance(values, list)), default=1)
+        for column in self.columns:
+            values = rows.get(column, np.nan)
+            if isinstance(values, list):
+                if len(values) != length:
+                    raise ValueError(f"Column {column} has {len(values)} values instead of {length}!")
+                self.data[column].extend(values)
+            else:
+                self.data[column].extend([values] * length)
+        self.length += length
+
+    def add_frame(self, df):
+        """
+        Add the rows of a dataframe. Columns it does not have are left empty.
+
+        Args:
+            df (pandas.core.frame.DataFrame): Rows to add
+        """
+        if len(df):
+            self.add_rows({column: df[column].tolist() for column in df.columns}, dtypes=df.dtypes)
+
+    def add_empty_row(self):
+        """
+        Add an empty row, as used to separate invoices.
+        """
+        self.add_rows({})
+
+    def build(self):
+        """
+        Build the dataframe of all rows added.
+
+        Returns:
+            df (pandas.core.frame.DataFrame): Dataframe of the result
+        """
+        df = pd.DataFrame(self.data, columns=self.columns, dtype=object)
+        for column in self.columns:
+            if self.numeric.get(column):
+                df[column] = df[column].infer_objects()
+        return df
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Libs
+import cv2
+import numpy as np
+import pandas as pd
+import pytesseract
+
+# Custom
+from ...config import tesseract_path
+
+##################
+# Configurations #
+##################
+
+pytesseract.pytesseract.tesseract_cmd = tesseract_path
+
+# Shortest ruling line kept, as a fraction of the page width (horizontal) or height (vertical)
+min_ruling_fraction = 1 / 15
+
+# Share of the table width (or height) a ruling must span to count as a row (or column) border
+border_fraction = 0.4
+
+# Pixels trimmed from each side of a cell so that its borders are not read
+cell_inset = 6
+
+# Body rows taller than this multiple of the median row height hold several lines that are not
+# ruled apart, which a single-line cell read would cut short
+max_row_height = 1.5
+
+# Number of cells read at the same time
+cell_workers = os.cpu_count() or 1
+
+# Characters allowed in a column, chosen by the first keyword found in its header
+column_whitelists = {
+    "DATE": "0123456789./",
+    "QTY": "0123456789.,",
+    "PRICE": "0123456789.,",
+    "RATE": "0123456789.,",
+    "AMOUNT": "0123456789.,",
+    "TOTAL": "0123456789.,",
+    "NO": "0123456789-/ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+}
+
+#############
+# Functions #
+#############
+
+def find_borders(profile, min_length):
+    """
+    Find the positions of ruling lines from a projection profile of a line mask.
+
+    Args:
+        profile (numpy.ndarray): Number of ruling pixels per row or column
+        min_length (float): Number of ruling pixels needed to count as a border
+
+    Returns:
+        borders (list[int]): Centre of each border, in order
+    """
+    positions = np.flatnonzero(profile >= min_length)
+    if positions.size == 0:
+        return []
+    groups = np.split(positions, np.flatnonzero(np.diff(positions) > 1) + 1)
+    return [int(group.mean()) for group in groups]
+
+
+def detect_table_grid(image):
+    """
+    Detect the ruled table on a binarised page with morphological opening, and
+    return the borders of its rows and columns.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+
+    Returns:
+        grid (tuple or None): (row_borders, column_borders) in page coordinates,
+        or None if no ruled table was found
+    """
+    page = np.array(image.convert("L"))
+    height, width = page.shape
+    _, ink = cv2.threshold(page, 127, 255, cv2.THRESH_BINARY_INV)
+
+    # Keep only long horizontal and vertical strokes
+    h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (int(width * min_ruling_fraction), 1))
+    v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, int(height * min_ruling_fraction)))
+    h_lines = cv2.morphologyEx(ink, cv2.MORPH_OPEN, h_kernel)
+    v_lines = cv2.morphologyEx(ink, cv2.MORPH_OPEN, v_kernel)
+
+    # The largest connected set of rulings is taken as the table
+    count, _, stats, _ = cv2.connectedComponentsWithStats(cv2.bitwise_or(h_lines, v_lines))
+    if count < 2:
+        return None
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_WIDTH] * stats[1:, cv2.CC_STAT_HEIGHT]))
+    left, top, table_width, table_height = (int(value) for value in stats[largest, :4])
+
+    h_table = h_lines[top : top + table_height, left : left + table_width]
+    v_table = v_lines[top : top + table_height, left : left + table_width]
+    rows = find_borders(np.count_nonzero(h_table, axis=1), border_fraction * table_width)
+    columns = find_borders(np.count_nonzero(v_table, axis=0), border_fraction * table_height)
+    if len(rows) < 2 or len(columns) < 2:
+        return None
+
+    return [top + y for y in rows], [left + x for x in columns]
+
+
+def column_whitelist(header):
+    """
+    Get the characters allowed in a column from its header.
+
+    Args:
+        header (str): Header of the column
+
+    Returns:
+        whitelist (str or None): Allowed characters, or None to allow any
+    """
+    for keyword, whitelist in column_whitelists.items():
+        if keyword in header.upper():
+            return whitelist
+    return None
+
+
+def find_span(borders, position):
+    """
+    Find the row or column of a grid that holds a position.
+
+    Args:
+        borders (list[int]): Row or column borders from detect_table_grid
+        position (float): Page coordinate along the same axis
+
+    Returns:
+        index (int or None): Index of the row or column, or None if outside the grid
+    """
+    for index, (start, end) in enumerate(zip(borders[:-1], borders[1:])):
+        if start <= position < end:
+            return index
+    return None
+
+
+def cell_crop(image, box):
+    """
+    Crop a table cell without its borders.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+        box (tuple): (left, top, right, bottom) of the cell, borders included
+
+    Returns:
+        crop (PIL.Image.Image or None): Inside of the cell, or None if it has no ink
+    """
+    left, top, right, bottom = box
+    crop = image.crop((left + cell_inset, top + cell_inset, right - cell_inset, bottom - cell_inset))
+    if crop.width <= 0 or crop.height <= 0 or np.array(crop.convert("L")).min() > 127:
+        return None
+    return crop
+
+
+def read_cell(image, box, whitelist=None):
+    """
+    Read a single table cell.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+        box (tuple): (left, top, right, bottom) of the cell, borders included
+        whitelist (str): Optional. Characters tesseract is allowed to output
+
+    Returns:
+        text (str): Text of the cell
+    """
+    # Skip blank cells without calling tesseract
+    crop = cell_crop(image, box)
+    if crop is None:
+        return ""
+
+    config = "--psm 7"
+    if whitelist:
+        config += f" -c tessedit_char_whitelist={whitelist}"
+    return pytesseract.image_to_string(crop, config=config).strip()
+
+
+def body_rows(image, grid, header_index, column):
+    """
+    Count the body rows of a ruled table that have ink in a column, without OCR.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+        grid (tuple): (row_borders, column_borders) from detect_table_grid
+        header_index (int): Index of the header row
+        column (int): Index of a column that is filled on every row, e.g. the date
+
+    Returns:
+        count (int): Number of body rows with ink in the column
+    """
+    row_borders, column_borders = grid
+    left, right = column_borders[column], column_borders[column + 1]
+    return sum(
+        cell_crop(image, (left, top, right, bottom)) is not None
+        for top, bottom in zip(row_borders[header_index + 1 : -1], row_borders[header_index + 2 :])
+    )
+
+
+def read_table(image, grid, header_index, headers):
+    """
+    Read the body of a ruled table cell by cell, below a header row that was
+    already found, e.g. on the OCR lines of the page. Only the given columns are
+    read, concurrently, each with the whitelist of its header. Tables whose body
+    rows are taller than max_row_height times the median row height are not read.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+        grid (tuple): (row_borders, column_borders) from detect_table_grid
+        header_index (int): Index of the header row
+        headers (dict): Header of each column to read, keyed by column index
+
+    Returns:
+        table (pandas.DataFrame or None): Body of the table in the given columns,
+        or None if the body rows are not ruled apart
+    """
+    row_borders, column_borders = grid
+    row_spans = list(zip(row_borders[:-1], row_borders[1:]))
+    median_height = np.median([bottom - top for top, bottom in row_spans])
+
+    # Cells are read as single lines, so give up on rows that hold several lines
+    body_spans = row_spans[header_index + 1 :]
+    if any(bottom - top > max_row_height * median_height for top, bottom in body_spans):
+        return None
+
+    # Read the body cells concurrently
+    columns = list(headers)
+    jobs = [
+        ((column_borders[c], top, column_borders[c + 1], bottom), column_whitelist(headers[c]))
+        for top, bottom in body_spans
+        for c in columns
+    ]
+    with ThreadPoolExecutor(max_workers=cell_workers) as executor:
+        texts = list(executor.map(lambda job: read_cell(image, *job), jobs))
+
+    body = [texts[r * len(columns) : (r + 1) * len(columns)] for r in range(len(body_spans))]
+    return pd.DataFrame(body, columns=[headers[c] for c in columns])
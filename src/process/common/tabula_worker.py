@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import json
+import os
+import queue
+import subprocess
+import threading
+
+# Libs
+import tabula
+from dotenv import load_dotenv
+from tabula.io import _jar_path
+from tabula.util import TabulaOption
+
+##################
+# Configurations #
+##################
+
+# Whether to extract tables with long-lived tabula workers instead of a JVM per call
+use_worker = True
+
+# Number of worker processes
+worker_count = 2
+
+# Java source of the worker, compiled with javac or else run directly by the java launcher (Java 11 or later)
+worker_source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "TabulaWorker.java")
+
+# Load environment variables
+load_dotenv()
+cache_path = os.getenv('CACHE_PATH') or "./data/cache/"
+
+# Folder the compiled worker is kept in
+class_dir = os.path.join(cache_path, "tabula_worker")
+
+# Seconds to wait for a worker to compile and start
+ready_timeout = 60
+
+# Seconds to wait for the answer to a request before the worker is killed
+answer_timeout = 120
+
+# Options passed to the JVM of each worker
+java_options = [
+    "-Djava.awt.headless=true",
+    "-Dfile.encoding=UTF8",
+    "-Dorg.slf4j.simpleLogger.defaultLogLevel=off",
+    "-Dorg.apache.commons.logging.Log=org.apache.commons.logging.impl.NoOpLog",
+]
+
+# Idle workers, created on first use
+worker_pool = None
+
+# Set once a worker fails to start, so that later calls go straight to tabula.read_pdf
+workers_unavailable = False
+
+pool_lock = threading.Lock()
+
+compile_lock = threading.Lock()
+
+###########
+# Classes #
+###########
+
+class TabulaWorker:
+    """
+    A tabula-java process that serves extraction requests over its stdin and
+    stdout, and is restarted if it dies. Its answers are read by a thread, so
+    that a worker that hangs is killed once its deadline passes.
+    """
+    def __init__(self):
+        self.process = None
+        self.answers = None
+
+    def start(self):
+        """
+        Start the worker process and wait until it is ready. If it cannot start,
+        e.g. without Java, workers are marked as unavailable.
+        """
+        global workers_unavailable
+        try:
+            self.process = subprocess.Popen(
+                worker_command(),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                encoding="utf-8",
+                bufsize=1,
+            )
+            self.answers = queue.Queue()
+            threading.Thread(target=read_lines, args=(self.process.stdout, self.answers), daemon=True).start()
+            ready = self.read_answer(ready_timeout) == "READY"
+        except OSError:
+            ready = False
+        if not ready:
+            self.stop()
+            workers_unavailable = True
+            raise RuntimeError("Tabula worker failed to start!")
+
+    def stop(self):
+        """
+        Stop the worker process, if it is running.
+        """
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def read_answer(self, timeout):
+        """
+        Wait for the next line the worker writes.
+
+        Args:
+            timeout (float): Seconds to wait
+
+        Returns:
+            answer (str or None): Line written, an empty string if the worker died, or None
+            if it did not answer in time
+        """
+        try:
+            return self.answers.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def send(self, args):
+        """
+        Send a request to the worker process and wait for its answer. The arguments
+        are sent as a JSON array, so that tabs and line breaks in paths are kept.
+
+        Args:
+            args (list[str]): tabula-java command line arguments, with the PDF path last
+
+        Returns:
+            answer (str or None): Answer of the worker, or None if it died
+        """
+        if self.process is None or self.process.poll() is not None:
+            self.start()
+        try:
+            self.process.stdin.write(json.dumps(args) + "\n")
+            self.process.stdin.flush()
+        except OSError:
+            self.stop()
+            return None
+
+        answer = self.read_answer(answer_timeout)
+        if answer is None:
+            self.stop()
+            raise RuntimeError("Tabula worker timed out!")
+        if not answer:
+            self.stop()
+            return None
+        return answer
+
+    def extract(self, args):
+        """
+        Extract tables with the worker, restarting it once if it died.
+
+        Args:
+            args (list[str]): tabula-java command line arguments, with the PDF path last
+
+        Returns:
+            raw_tables (list): Decoded tabula-java JSON output
+        """
+        answer = self.send(args)
+        if answer is None:
+            answer = self.send(args)
+        if answer is None:
+            raise RuntimeError("Tabula worker died!")
+
+        status, _, payload = answer.partition("\t")
+        if status != "OK":
+            raise RuntimeError(f"Tabula worker error: {payload}")
+        return json.loads(payload) if payload else []
+
+#############
+# Functions #
+#############
+
+def read_lines(stream, lines):
+    """
+    Put each line of a stream in a queue, without its line break, then an empty
+    string once the stream ends. The worker never writes empty lines.
+
+    Args:
+        stream (io.TextIOBase): Stream to read
+        lines (queue.Queue): Queue the lines are put in
+    """
+    for line in stream:
+        lines.put(line.rstrip("\n"))
+    lines.put("")
+
+
+def compile_worker():
+    """
+    Compile the worker into the cache with javac, unless it was compiled from the
+    current source already. The compiled class runs on a plain JRE, while the
+    source launcher needs the jdk.compiler module.
+
+    Returns:
+        compiled (bool): Whether the compiled worker is available
+    """
+    class_path = os.path.join(class_dir, "TabulaWorker.class")
+    with compile_lock:
+        if os.path.exists(class_path) and os.path.getmtime(class_path) >= os.path.getmtime(worker_source):
+            return True
+        try:
+            os.makedirs(class_dir, exist_ok=True)
+            subprocess.run(
+                ["javac", "-cp", _jar_path(), "-d", class_dir, worker_source],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+                timeout=ready_timeout,
+            )
+        except (OSError, subprocess.SubprocessError):
+            return False
+        return True
+
+
+def worker_command():
+    """
+    Get the command that starts a worker: the compiled class if javac is
+    available, or else the source with the source launcher.
+
+    Returns:
+        command (list[str]): Command line of the worker process
+    """
+    if compile_worker():
+        return ["java"] + java_options + ["-cp", os.pathsep.join([class_dir, _jar_path()]), "TabulaWorker"]
+    return ["java"] + java_options + ["-cp", _jar_path(), worker_source]
+
+
+def get_worker_pool():
+    """
+    Get the pool of idle workers, creating it on first use.
+
+    Returns:
+        pool (queue.Queue): Idle workers
+    """
+    global worker_pool
+    with pool_lock:
+        if worker_pool is None:
+            worker_pool = queue.Queue()
+            for _ in range(worker_count):
+                worker_pool.put(TabulaWorker())
+    return worker_pool
+
+
+def read_pdf_json(file_path, pages="all", **options):
+    """
+    Extract tables from a PDF as tabula-java JSON, with an idle worker if possible
+    or with tabula.read_pdf otherwise.
+
+    Args:
+        file_path (str): Path to PDF file
+        pages (str, int or list): Optional. Pages to read, as for tabula.read_pdf. Defaults to "all"
+        **options: Other tabula.read_pdf options, e.g. area, columns, lattice or stream
+
+    Returns:
+        raw_tables (list): Decoded tabula-java JSON output
+    """
+    if use_worker and not workers_unavailable:
+        args = TabulaOption(pages=pages, format="JSON", **options).build_option_list()
+        pool = get_worker_pool()
+        worker = pool.get()
+        try:
+            return worker.extract(args + [os.path.abspath(file_path)])
+        except RuntimeError:
+            # Fall back to tabula.read_pdf, which also surfaces extraction errors as before
+            pass
+        finally:
+            pool.put(worker)
+
+    return tabula.read_pdf(file_path, pages=pages, output_format="json", **options)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import os
+
+# Libs
+import numpy as np
+
+##################
+# Configurations #
+##################
+
+# Pages with more pixels than this are split into bands, e.g. A4 pages above ~350 DPI
+tile_min_pixels = 12_000_000
+
+# Target height of each band, in pixels
+band_height = 1500
+
+# Extra rows read above and below each band, so that no text line is cut in half
+band_overlap = 120
+
+# How far above the target cut to look for a blank row, in pixels
+gap_search = 400
+
+# Number of bands read at the same time
+tile_workers = os.cpu_count() or 1
+
+#############
+# Functions #
+#############
+
+def split_into_bands(image):
+    """
+    Split a binarised page into horizontal bands, cutting at blank rows whenever
+    possible. Each band owns the rows between its cuts, and is read with some
+    overlap into its neighbours.
+
+    Args:
+        image (PIL.Image.Image): Binarised page image
+
+    Returns:
+        bands (list[tuple]): List of (read_top, read_bottom, own_top, own_bottom)
+    """
+    page = np.array(image.convert("L"))
+    height = page.shape[0]
+    blank_rows = page.min(axis=1) > 127
+
+    # Find the cuts, preferring the lowest blank row above each target
+    cuts = [0]
+    while height - cuts[-1] > band_height + band_overlap:
+        target = cuts[-1] + band_height
+        gaps = np.flatnonzero(blank_rows[target - gap_search : target])
+        cuts.append(target - gap_search + int(gaps[-1]) if gaps.size else target)
+    cuts.append(height)
+
+    return [
+        (max(top - band_overlap, 0), min(bottom + band_overlap, height), top, bottom)
+        for top, bottom in zip(cuts[:-1], cuts[1:])
+    ]
+
+
+def keep_owned_lines(lines, own_top, own_bottom):
+    """
+    Keep the lines of a band whose vertical centre lies in the rows it owns,
+    dropping the copies read in the overlap with its neighbours.
+
+    Args:
+        lines (dict): Dictionary of line keys and their list of words
+        own_top (int): First row owned by the band
+        own_bottom (int): Row after the last one owned by the band
+
+    Returns:
+        lines (dict): Dictionary of the lines owned by the band
+    """
+    owned = {}
+    for line_key, words in lines.items():
+        centre = (min(word.top for word in words) + max(word.bottom for word in words)) / 2
+        if own_top <= centre < own_bottom:
+            owned[line_key] = words
+    return owned
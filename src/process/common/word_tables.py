@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import os
+import subprocess
+import xml.etree.ElementTree as ET
+
+# Libs
+import numpy as np
+
+# Custom
+from .pdf_tables import tables_from_json
+from ...config import poppler_path
+
+##################
+# Configurations #
+##################
+
+# Words whose vertical centres are closer than this fraction of the median word height share a row
+row_tolerance = 0.5
+
+# Namespace of the XHTML written by pdftotext
+xhtml_namespace = "{http://www.w3.org/1999/xhtml}"
+
+#############
+# Functions #
+#############
+
+def read_word_boxes(file_path):
+    """
+    Read every word of the text layer of a PDF with its bounding box, using
+    pdftotext from poppler.
+
+    Args:
+        file_path (str): Path to PDF file
+
+    Returns:
+        pages (list[list[tuple]]): (x_min, y_min, x_max, y_max, text) of each word, per page
+    """
+    output = subprocess.run(
+        [os.path.join(poppler_path, "pdftotext"), "-bbox-layout", file_path, "-"],
+        capture_output=True,
+        check=True,
+    ).stdout
+
+    pages = []
+    for page in ET.fromstring(output).iter(f"{xhtml_namespace}page"):
+        words = []
+        for word in page.iter(f"{xhtml_namespace}word"):
+            box = tuple(float(word.get(name)) for name in ("xMin", "yMin", "xMax", "yMax"))
+            words.append(box + ((word.text or "").strip(),))
+        pages.append(words)
+    return pages
+
+
+def group_rows(words):
+    """
+    Group words into rows by their vertical centres, with the words of each row
+    ordered from left to right.
+
+    Args:
+        words (list[tuple]): (x_min, y_min, x_max, y_max, text) of each word
+
+    Returns:
+        rows (list[list[tuple]]): Words of each row, from top to bottom
+    """
+    if not words:
+        return []
+    tolerance = row_tolerance * np.median([y_max - y_min for _, y_min, _, y_max, _ in words])
+
+    rows = []
+    centre = None
+    for word in sorted(words, key=lambda word: (word[1] + word[3]) / 2):
+        word_centre = (word[1] + word[3]) / 2
+        if rows and word_centre - centre <= tolerance:
+            rows[-1].append(word)
+        else:
+            rows.append([word])
+            centre = word_centre
+    return [sorted(row) for row in rows]
+
+
+def match_header(row, headers):
+    """
+    Find the header of each column in a row. Labels with more words are matched
+    first, so that e.g. "UNIT" does not take the first word of "UNIT PRICE".
+    Trailing dots and colons are ignored on both sides, e.g. "DISC." matches "DISC".
+
+    Args:
+        row (list[tuple]): Words of the row, from left to right
+        headers (list): Label of each column, or a tuple of alternative labels
+
+    Returns:
+        columns (list[tuple] or None): (label, x_min, x_max) of each column, from left
+        to right, or None if the row is not the header
+    """
+    texts = [word[4].upper().strip(".:") for word in row]
+    used = [False] * len(row)
+
+    alternatives = [(label,) if isinstance(label, str) else tuple(label) for label in headers]
+    order = sorted(range(len(headers)), key=lambda k: -max(len(label.split()) for label in alternatives[k]))
+
+    columns = [None] * len(headers)
+    for k in order:
+        for label in sorted(alternatives[k], key=lambda label: -len(label.split())):
+            parts = [part.strip(".:") for part in label.upper().split()]
+            for start in range(len(row) - len(parts) + 1):
+                span = range(start, start + len(parts))
+                if not any(used[i] for i in span) and texts[start : start + len(parts)] == parts:
+                    for i in span:
+                        used[i] = True
+                    columns[k] = (label, row[start][0], row[start + len(parts) - 1][2])
+                    break
+            if columns[k] is not None:
+                break
+        if columns[k] is None:
+            return None
+    return sorted(columns, key=lambda column: column[1])
+
+
+def split_cells(row, columns):
+    """
+    Split the words of a row into the cells of the columns. Column borders are
+    halfway between neighbouring headers, and each word goes to the column its
+    centre falls in.
+
+    Args:
+        row (list[tuple]): Words of the row, from left to right
+        columns (list[tuple]): (label, x_min, x_max) of each column, from left to right
+
+    Returns:
+        cells (list[str]): Text of each cell
+    """
+    borders = [(left[2] + right[1]) / 2 for left, right in zip(columns, columns[1:])]
+    cells = [[] for _ in columns]
+    for word in row:
+        k = int(np.searchsorted(borders, (word[0] + word[2]) / 2))
+        cells[k].append(word[4])
+    return [" ".join(cell) for cell in cells]
+
+
+def read_word_tables(file_path, headers, anchor, end_pattern=None):
+    """
+    Read a vendor's item table from the text layer of a PDF without tabula. Words
+    are grouped into rows, and the columns are placed under the vendor's known
+    headers. A row starts on each line with a value under the anchor column, and
+    other lines are wrapped text of the row above, joined with a carriage return
+    as tabula does. Pages without the header keep the columns of the page before.
+
+    Args:
+        file_path (str): Path to PDF file
+        headers (list): Label of each column, or a tuple of alternative labels
+        anchor (str): Label of the column that has a value on every row, e.g. "QTY"
+        end_pattern (re.Pattern): Optional. Pattern of the line that ends the table
+            on a page, e.g. the total. Defaults to None
+
+    Returns:
+        page_tables (dict): Lists of at most one table, keyed by page number starting from 1
+        end_page (int or None): First page number end_pattern was found on, or None
+    """
+    anchor_labels = next(
+        (label,) if isinstance(label, str) else tuple(label)
+        for label in headers
+        if label == anchor or (not isinstance(label, str) and anchor in label)
+    )
+
+    page_tables = {}
+    end_page = None
+    columns = None
+    for page_number, words in enumerate(read_word_boxes(file_path), start=1):
+        page_tables[page_number] = []
+        rows = group_rows(words)
+        body = 0
+        for k, row in enumerate(rows):
+            header = match_header(row, headers)
+            if header is not None:
+                columns = header
+                body = k + 1
+                break
+        if columns is None:
+            continue
+
+        labels = [column[0] for column in columns]
+        anchor_index = next(k for k, label in enumerate(labels) if label in anchor_labels)
+        data = []
+        for row in rows[body:]:
+            cells = split_cells(row, columns)
+            if cells[anchor_index]:
+                data.append(cells)
+            elif end_pattern is not None and end_pattern.search(" ".join(word[4] for word in row)):
+                end_page = end_page or page_number
+                break
+            elif data:
+                data[-1] = [f"{above}\r{below}" if above and below else above or below for above, below in zip(data[-1], cells)]
+
+        if data:
+            raw_table = {"data": [[{"text": text} for text in cells] for cells in [labels] + data]}
+            page_tables[page_number] = tables_from_json([raw_table])
+    return page_tables, end_page
@@ -10,6 +10,7 @@ import streamlit as st
 
 # Custom
 from .gw_utils import get_scanned_tables
+from ..common.digits import save_templates
 
 #############
 # Functions #
@@ -42,6 +43,9 @@ def gw_main(pdf_file_paths):
         progress.progress(percent_complete)
         status_text.text(f"Processed: {index + 1}/{len(pdf_file_paths)} files ({int(percent_complete*100)}% complete)")
 
+    # Keep the harvested glyphs for the next batch
+    save_templates()
+
     # Combine all tables
     df_all = pd.concat(df_pdfs, ignore_index=True)
 
@@ -8,14 +8,16 @@
 import re
 
 # Libs
-import cv2
-import numpy as np
 import pandas as pd
 import pytesseract
 from pdf2image import convert_from_path
-from PIL import Image
 
 # Custom
+from ..common.normalize import normalize_page, page_key
+from ..common.page_model import get_page_document, report_doubtful_pages
+from ..common.reocr import read_field, read_field_with_conf, reject_confidence
+from ..common.results import ResultAccumulator
+from ..common.tables import body_rows, detect_table_grid, find_span, read_table
 from ...config import poppler_path, tesseract_path
 
 ##################
@@ -24,6 +26,17 @@ from ...config import poppler_path, tesseract_path
 
 pytesseract.pytesseract.tesseract_cmd = tesseract_path
 
+# Only OCR the detected text regions instead of the whole page. Off until timed against
+# whole-page reads on real scans, as each region is a separate tesseract call
+region_ocr = False
+
+# Re-read the date and DO cells of ruled DO tables when the OCR lines miss DOs. Off until
+# timed against the line parse on real scans, as each cell is a separate tesseract call
+cell_ocr = False
+
+# Match reference numbers against glyphs harvested from earlier reads before re-reading them
+template_digits = True
+
 inv_no_pattern = re.compile(r'(?P<inv_no>\d{8,10})')
 do_date_pattern = re.compile(r'\s*DATE\s*(?P<do_date>\d{2}[./]\d{2}[./]\d{2,4})')
 subtotal_pattern = re.compile(r'.*?\s*(?P<subtotal>\d{1,3}(?:,\d{3})*(?:\.\d{2})?)')
@@ -35,7 +48,7 @@ date_pattern = re.compile(r'(?P<date>\d{2}[./]\d{2}[./]\d{4})')
 
 def convert_pdf_to_binimg(file_path):
     """
-    Converts a PDF into a list of binarised images.
+    Converts a PDF into a list of normalized, binarised images.
 
     Args:
         file_path (str): Path to PDF file
@@ -46,63 +59,51 @@ def convert_pdf_to_binimg(file_path):
     # Convert PDF to images for each page
     images = convert_from_path(file_path, poppler_path=poppler_path, dpi=500)
 
-    # Preprocessing each image
+    # Normalize each image: fix its orientation and skew, then binarise it
     preprocessed_images = []
-    for img in images:
-        # Convert image to grayscale and binarise it
-        img_np = np.array(img)
-        gray = cv2.cvtColor(img_np, cv2.COLOR_BGR2GRAY)
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-        # Convert back to PIL Image for downstream processing
-        preprocessed_img = Image.fromarray(binary)
-        preprocessed_images.append(preprocessed_img)
+    for page_index, img in enumerate(images):
+        key = page_key(file_path, page_index, 500)
+        preprocessed_images.append(normalize_page(img, key=key))
 
     return preprocessed_images
 
 
-def get_scanned_data(image):
+def get_scanned_data(document):
     """
-    Extracts the invoice number, DO date, and subtotal from an image using OCR.
+    Extracts the invoice number, DO date, and subtotal from a page using OCR.
 
     Args:
-        image (PIL.Image.Image): A binarized image containing the text to be processed.
+        document (PageDocument): Document model of the page to be processed.
 
     Returns:
         inv_no (str or None): The extracted invoice number, or None if not found.
         do_date (str or None): The extracted date of the DO, or None if not found.
         subtotal (float or None): The extracted subtotal value, or None if not found.
+        subtotal_doubtful (bool): Whether the subtotal was read with low confidence.
     """
-    # Perform OCR using pytesseract
-    text = pytesseract.image_to_string(image)
-    lines = text.split('\n')
-
     # Initialise placeholder values
     inv_no = None
     do_date = None
     subtotal = None
 
-    # Loop through each line to find required info
-    for line in lines:
-        # Get invoice number
-        if "REFERENCE NO" in line.upper():
-            inv_match = re.search(inv_no_pattern, line)
-            if inv_match:
-                inv_no = inv_match.group("inv_no")
-                
-        if "DATE" in line.upper():
-            date_match = re.search(do_date_pattern, line.upper())
-            if date_match:
-                do_date = date_match.group("do_date")
+    # Get invoice number
+    inv_match = read_field(document, "REFERENCE NO", inv_no_pattern, font="GW" if template_digits else None)
+    if inv_match:
+        inv_no = inv_match.group("inv_no")
+
+    # Get date of the DO
+    date_match = read_field(document, "DATE", do_date_pattern, upper=True)
+    if date_match:
+        do_date = date_match.group("do_date")
 
-        # Get sub total of each DO
-        if "BEFORE TAX" in line.upper():
-            subtotal_match = re.search(subtotal_pattern, line)
-            if subtotal_match:
-                subtotal_str = subtotal_match.group("subtotal")
-                subtotal = float(subtotal_str.replace(",", ""))
+    # Get sub total of each DO, keeping doubtful values as they mark the end of a DO
+    subtotal_match, subtotal_conf = read_field_with_conf(document, "BEFORE TAX", subtotal_pattern)
+    if subtotal_match:
+        subtotal_str = subtotal_match.group("subtotal")
+        subtotal = float(subtotal_str.replace(",", ""))
+    subtotal_doubtful = subtotal is not None and subtotal_conf < reject_confidence
 
-    return inv_no, do_date, subtotal
+    return inv_no, do_date, subtotal, subtotal_doubtful
 
 
 def fill_missing_entries(info_list, start_indices, end_indices):
@@ -133,13 +134,14 @@ def fill_missing_entries(info_list, start_indices, end_indices):
     return info_list
 
 
-def get_scanned_info(preprocessed_images):
+def get_scanned_info(documents, file_path):
     """
     Extracts key information (invoice number, delivery order date, and subtotal) 
-    from a PDF file by converting it into binarized images and processing the data.
+    from the document models of a scanned PDF.
 
     Args:
-        preprocessed_images (list): List of binarised images
+        documents (list): List of page document models
+        file_path (str): The path to the PDF file, for reporting doubtful subtotals
 
     Returns:
         start_indices (list): List of index that indicates the start of the DO.
@@ -148,15 +150,21 @@ def get_scanned_info(preprocessed_images):
         do_date_list (list): List of document date from the scanned document.
         subtotal_list (list): List of subtotal from the scanned document.
     """
-    # Extracts invoice number and subtotal from the images
+    # Extracts invoice number and subtotal from the pages
     inv_no_list = []
     do_date_list = []
     subtotal_list = []
-    for image in preprocessed_images:
-        inv_no, do_date, subtotal = get_scanned_data(image)
+    doubtful_pages = []
+    for page_index, document in enumerate(documents):
+        inv_no, do_date, subtotal, subtotal_doubtful = get_scanned_data(document)
         inv_no_list.append(inv_no)
         do_date_list.append(do_date)
         subtotal_list.append(subtotal)
+        if subtotal_doubtful:
+            doubtful_pages.append(page_index + 1)
+
+    # Report doubtful subtotals, as they decide where each DO ends
+    report_doubtful_pages(file_path, doubtful_pages)
 
     # Get the start and end positions of each DO
     subtotal_positions = [i for i, x in enumerate(subtotal_list) if x is not None]
@@ -170,6 +178,91 @@ def get_scanned_info(preprocessed_images):
     return start_indices, end_indices, inv_no_list, do_date_list, subtotal_list
 
 
+def get_table_lines(lines):
+    """
+    Extracts the DO date and DO number of each table row from the OCR lines of a page.
+
+    Args:
+        lines (list[str]): OCR lines of the page
+
+    Returns:
+        rows (list[tuple]): List of (date, do_no) for each row of the table
+    """
+    rows = []
+    table_reached = False
+
+    # Loop through each line to find table info
+    for line in lines:
+        # Check if table header is found
+        if ("QTY" in line.upper()) and ("UNIT" in line.upper()):
+            table_reached = True
+            continue
+
+        if table_reached:
+            date_match = re.search(date_pattern, line)
+            if date_match:
+                date = date_match.group("date").strip()
+                contents = line.split()
+                if len(contents) > 1:
+                    do_no = contents[1]
+                else:
+                    do_no = None
+                rows.append((date, do_no))
+
+    return rows
+
+
+def get_table_cells(image, document, line_rows):
+    """
+    Extracts the DO date and DO number of each table row by reading the cells
+    of the ruled DO table. The header row and the date column are placed from
+    the OCR lines of the page, and only the date and DO cells are read. Nothing
+    is read when the OCR lines already give a DO for every filled row.
+
+    Args:
+        image (PIL.Image.Image): A binarized image of the page.
+        document (PageDocument): Words and lines read from the page
+        line_rows (list[tuple]): (date, do_no) of each row from get_table_lines
+
+    Returns:
+        rows (list[tuple] or None): List of (date, do_no) for each row of the table,
+        or None if no ruled DO table was found or the OCR lines are complete
+    """
+    grid = detect_table_grid(image)
+    if grid is None:
+        return None
+    row_borders, column_borders = grid
+
+    # Place the header row and the date column from the header line
+    header_lines = [line for line in document.find_lines("QTY") if "UNIT" in line.text.upper()]
+    date_words = [word for line in header_lines[:1] for word in line.words if "DATE" in word.text.upper()]
+    if not date_words:
+        return None
+    date_word = date_words[0]
+    header_index = find_span(row_borders, (date_word.top + date_word.bottom) / 2)
+    date_column = find_span(column_borders, (date_word.left + date_word.right) / 2)
+
+    # The DO number is in the column after the date, as on the OCR lines
+    if header_index is None or date_column is None or date_column + 2 >= len(column_borders):
+        return None
+
+    # The lines are complete when they give a DO for every row with a date
+    if all(do_no for _, do_no in line_rows) and len(line_rows) >= body_rows(image, grid, header_index, date_column):
+        return None
+
+    table = read_table(image, grid, header_index, {date_column: "DATE", date_column + 1: "DO NO"})
+    if table is None:
+        return None
+
+    rows = []
+    for date, do_no in table.itertuples(index=False):
+        date_match = re.search(date_pattern, date)
+        if date_match:
+            rows.append((date_match.group("date").strip(), do_no or None))
+
+    return rows
+
+
 def get_scanned_tables(file_path):
     """
     Extracts and processes tabular data from scanned PDFs.
@@ -207,72 +300,51 @@ def get_scanned_tables(file_path):
         "Vendor Invoice Subtotal",
     ]
 
-    df_pdf = pd.DataFrame(columns=data_headers)
-    df_pdf["Inv No."] = df_pdf["Inv No."].astype(object)
-    df_pdf["Date"] = df_pdf["Date"].astype(object)
+    results = ResultAccumulator(data_headers)
 
-    # Converts PDF into a list of binarised images
+    # Converts PDF into a list of binarised images, and read each page once
     preprocessed_images = convert_pdf_to_binimg(file_path=file_path)
+    documents = [get_page_document(image, region_ocr) for image in preprocessed_images]
 
     # Get scanned info
-    start_indices, end_indices, inv_no_list, do_date_list, subtotal_list = get_scanned_info(preprocessed_images)
+    start_indices, end_indices, inv_no_list, do_date_list, subtotal_list = get_scanned_info(documents, file_path)
 
     for start, end in zip(start_indices, end_indices):
         # Get all dataframes for the same DO and combine them
         do_pages = [i for i in range(start, end + 1)]
 
-        # Initialise list to store tabular df
-        data_list = []
+        # Initialise column values of the DO
+        do_rows = {"For Month (YYYY MM)": [], "DO Date": [], "DO No.": []}
 
         for page in do_pages:
-            # Perform OCR using pytesseract
-            image = preprocessed_images[page]
-            text = pytesseract.image_to_string(image)
-            lines = text.split('\n')
-            table_reached = False
-
-            # Loop through each line to find table info
-            for line in lines:
-                # Check if table header is found
-                if ("QTY" in line.upper()) and ("UNIT" in line.upper()):
-                    table_reached = True
-                    continue
-
-                if table_reached:
-                    date_match = re.search(date_pattern, line)
-                    if date_match:
-                        date = date_match.group("date").strip()
-                        contents = line.split()
-                        if len(contents) > 1:
-                            do_no = contents[1]
-                        else:
-                            do_no = None
-                        date = date.replace(".", "/")
-                        date_month = pd.to_datetime(date, dayfirst=True).strftime("%Y %m")
-                        date_day = pd.to_datetime(date, dayfirst=True).strftime("%-d/%-m/%Y")
-                        data_list.append(
-                            {
-                                "For Month (YYYY MM)": date_month,
-                                "DO Date": date_day,
-                                "DO No.": do_no,
-                            }
-                        )
-
-        # Create a DataFrame from data_list
-        temp_df = pd.DataFrame(data_list)
-        
+            # Read the ruled table if there is one, else reuse the lines read for the scanned info.
+            # The lines are also used when the cells give fewer DOs, as rows were then lost
+            line_rows = get_table_lines([line.text for line in documents[page].lines])
+            rows = get_table_cells(preprocessed_images[page], documents[page], line_rows) if cell_ocr else None
+            if rows is None or len(rows) < len(line_rows):
+                rows = line_rows
+
+            for date, do_no in rows:
+                date = date.replace(".", "/")
+                do_rows["For Month (YYYY MM)"].append(pd.to_datetime(date, dayfirst=True).strftime("%Y %m"))
+                do_rows["DO Date"].append(pd.to_datetime(date, dayfirst=True).strftime("%-d/%-m/%Y"))
+                do_rows["DO No."].append(do_no)
+
+        # Keep a row for the document data even if no DO was read
+        length = max(len(do_rows["DO No."]), 1)
+        for values in do_rows.values():
+            values.extend([None] * (length - len(values)))
+
         # Add overall document data to the first row
-        temp_df["Inv No."] = pd.Series(dtype=object)
-        temp_df["Date"] = pd.Series(dtype=object)
-        temp_df.loc[0, "Inv No."] = inv_no_list[end]
-        temp_df.loc[0, "Date"] = do_date_list[end]
-        temp_df.loc[0, "TOTAL AMT per INV"] = subtotal_list[end]
+        do_rows["Inv No."] = [inv_no_list[end]] + [None] * (length - 1)
+        do_rows["Date"] = [do_date_list[end]] + [None] * (length - 1)
+        do_rows["TOTAL AMT per INV"] = [subtotal_list[end]] + [None] * (length - 1)
 
-        # Concatenate the data to the main df_pdf
-        df_pdf = pd.concat([df_pdf, temp_df], ignore_index=True)
+        # Add the rows of the DO
+        results.add_rows(do_rows)
 
     # Add an empty row at the end, as per requirements
-    empty_row = pd.DataFrame([[pd.NA] * len(df_pdf.columns)], columns=df_pdf.columns)
-    df_pdf = pd.concat([df_pdf, empty_row], ignore_index=True)
+    results.add_empty_row()
+    df_pdf = results.build()
 
     return df_pdf
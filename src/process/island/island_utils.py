@@ -9,16 +9,19 @@ import os
 import re
 
 # Libs
-import cv2
 import numpy as np
 import pandas as pd
 import pytesseract
 import streamlit as st
-import tabula
 from pdf2image import convert_from_path
-from PIL import Image
 
 # Custom
+from ..common.layout_hints import hint_options, load_layout_hints
+from ..common.normalize import normalize_page, page_key
+from ..common.page_model import get_page_document, report_doubtful_pages
+from ..common.pdf_tables import read_page_tables
+from ..common.reocr import read_field, read_field_with_conf, reject_confidence
+from ..common.word_tables import read_word_tables
 from ...config import poppler_path, tesseract_path
 
 ##################
@@ -27,10 +30,38 @@ from ...config import poppler_path, tesseract_path
 
 pytesseract.pytesseract.tesseract_cmd = tesseract_path
 
+# Only OCR the detected text regions instead of the whole page. Off until timed against
+# whole-page reads on real scans, as each region is a separate tesseract call
+region_ocr = False
+
+# Engine the DO tables are read with, "tabula" or "words" for poppler word boxes without Java
+table_engine = "tabula"
+
+# Folder the tabula layout hints are calibrated into, see calibrate_layout_hints
+vendor_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Number of columns of a DO table: date, DO, description, qty, rate and amount
+do_table_width = 6
+
+# Headers of the DO table columns, for the "words" engine: date, DO, description, qty, rate and amount
+word_headers = [
+    "DATE",
+    ("DO NO", "D/O NO", "DO"),
+    "DESCRIPTION",
+    ("QTY", "QUANTITY"),
+    ("UNIT RATE", "RATE", "UNIT PRICE"),
+    "AMOUNT",
+]
+
+# Line after the last item of a DO page, for the "words" engine
+sub_total_pattern = re.compile(r"SUB\s*TOTAL", re.IGNORECASE)
+
 inv_no_pattern = re.compile(r"(?P<inv_no>\d{8,})")
 
 do_date_pattern = re.compile(r"DOCUMENT\s*DATE\s*(?P<do_date>\d{2}/\d{2}/\d{2,4})")
 
+subtotal_pattern = re.compile(r"(?P<subtotal>\d[\d,]*(?:\.\d+)?)\s*$")
+
 desc_pattern = re.compile(
     r"(?P<grade>G\d{2})\s*"  # Matches the grade
     r"(?P<slump>\d{3}-\d{3})\s*"  # Matches the slump
@@ -59,7 +90,7 @@ grade_dict = {
 
 def convert_pdf_to_binimg(file_path):
     """
-    Converts a PDF into a list of binarised images.
+    Converts a PDF into a list of normalized, binarised images.
 
     Args:
         file_path (str): Path to PDF file
@@ -70,66 +101,56 @@ def convert_pdf_to_binimg(file_path):
     # Convert PDF to images for each page
     images = convert_from_path(file_path, poppler_path=poppler_path, dpi=300)
 
-    # Preprocessing each image
+    # Normalize each image: fix its orientation and skew, then binarise it
     preprocessed_images = []
-    for img in images:
-        # Convert image to grayscale and binarise it
-        img_np = np.array(img)
-        gray = cv2.cvtColor(img_np, cv2.COLOR_BGR2GRAY)
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-        # Convert back to PIL Image for downstream processing
-        preprocessed_img = Image.fromarray(binary)
-        preprocessed_images.append(preprocessed_img)
+    for page_index, img in enumerate(images):
+        key = page_key(file_path, page_index, 300)
+        preprocessed_images.append(normalize_page(img, key=key))
 
     return preprocessed_images
 
 
-def get_scanned_data(image):
+def get_scanned_data(document):
     """
-    Extracts the invoice number, DO date, and subtotal from an image using OCR.
+    Extracts the invoice number, DO date, and subtotal from a page using OCR.
 
     Args:
-        image (PIL.Image.Image): A binarized image containing the text to be processed.
+        document (PageDocument): Document model of the page to be processed.
 
     Returns:
         inv_no (str or None): The extracted invoice number, or None if not found.
         do_date (str or None): The extracted date of the DO, or None if not found.
         subtotal (float or None): The extracted subtotal value, or None if not found.
         building (str or None): The extracted building name, or None if not found.
+        subtotal_doubtful (bool): Whether the subtotal was read with low confidence.
     """
-    # Perform OCR using pytesseract
-    text = pytesseract.image_to_string(image)
-    lines = text.split("\n")
-
     # Initialise placeholder values
     inv_no = None
     do_date = None
     subtotal = None
     building = None
 
-    # Loop through each line to find required info
-    for line in lines:
-        # Get invoice number
-        if "INVOICE NO" in line.upper():
-            inv_match = re.search(inv_no_pattern, line)
-            if inv_match:
-                inv_no = inv_match.group("inv_no")
+    # Get invoice number
+    inv_match = read_field(document, "INVOICE NO", inv_no_pattern)
+    if inv_match:
+        inv_no = inv_match.group("inv_no")
 
-        if "DOCUMENT DATE" in line.upper():
-            date_match = re.search(do_date_pattern, line.upper())
-            if date_match:
-                do_date = date_match.group("do_date")
+    # Get document date
+    date_match = read_field(document, "DOCUMENT DATE", do_date_pattern, upper=True)
+    if date_match:
+        do_date = date_match.group("do_date")
 
-        # Get sub total of each DO
-        if "SUB TOTAL" in line.upper():
-            subtotal_str = line.split(" ")[-1]
-            subtotal = float(subtotal_str.replace(",", ""))
+    # Get sub total of each DO, keeping doubtful values as they mark the end of a DO
+    subtotal_match, subtotal_conf = read_field_with_conf(document, "SUB TOTAL", subtotal_pattern)
+    if subtotal_match:
+        subtotal = float(subtotal_match.group("subtotal").replace(",", ""))
+    subtotal_doubtful = subtotal is not None and subtotal_conf < reject_confidence
 
-        if "PROJECT" in line.upper():
-            building = line.split("-")[0].split(":")[1].strip()
+    # Get building name
+    for line in document.find_lines("PROJECT"):
+        building = line.text.split("-")[0].split(":")[1].strip()
 
-    return inv_no, do_date, subtotal, building
+    return inv_no, do_date, subtotal, building, subtotal_doubtful
 
 
 def fill_missing_entries(info_list, start_indices, end_indices):
@@ -179,39 +200,29 @@ def add_nan_col(df, col_name):
     return df
 
 
-def extract_description(desc):
+def extract_descriptions(descriptions):
     """
-    Extract data from description for code columns in resulting Excel.
+    Extract data from descriptions for code columns in resulting Excel, for all rows at once.
 
     Args:
-        desc (str): Description2 value
+        descriptions (pandas.Series): Description2 values
 
     Returns:
-        grade (str): Grade of concrete, or None if not found
-        slump (str): Slump value, or None if not found
-        rtd (str): RTD if retardant was used, else None
-        duration (str): Duration of retardation, or None if not found
+        df_codes (pandas.DataFrame): Grade of concrete, slump with "MM", RTD if retardant
+        was used and duration of retardation with "R", NaN where not found
     """
-    # If description is not a string, return None for all values
-    if not isinstance(desc, str):
-        return None, None, None, None
-
-    # Attempt to match the description with the regex pattern
-    match = re.search(desc_pattern, desc)
-
-    # Extract values or default to None if no match or group is missing
-    if match:
-        gde = match.group("grade") if match.group("grade") else None
-        slump = match.group("slump") if match.group("slump") else None
-        duration = match.group("duration") if match.group("duration") else None
-        rtd = match.group("rtd") if match.group("rtd") else None
-    else:
-        gde = slump = duration = rtd = None  # Default to None if no match
+    # Match each description with the regex pattern, treating empty groups as not found
+    matches = descriptions.astype("object").str.extract(desc_pattern).replace("", np.nan)
 
-    # Convert grade data if available, otherwise default to None
-    grade = grade_dict.get(gde[-2:]) if gde else None
-
-    return grade, slump, rtd, duration
+    return pd.DataFrame(
+        {
+            "Conc. Grade": matches["grade"].str[-2:].map(grade_dict),
+            "Conc. Slump": matches["slump"].str.strip() + "MM",
+            "Admix. 1": matches["rtd"],
+            "Admix. 2": matches["duration"].str.strip() + "R",
+        },
+        index=descriptions.index,
+    )
 
 
 def get_scanned_info(file_path):
@@ -232,17 +243,23 @@ def get_scanned_info(file_path):
     # Converts PDF into a list of binarised images
     preprocessed_images = convert_pdf_to_binimg(file_path=file_path)
 
-    # Extracts invoice number and subtotal from the images
+    # Extracts invoice number and subtotal from the images, reading each page once
     inv_no_list = []
     do_date_list = []
     subtotal_list = []
     building_list = []
-    for image in preprocessed_images:
-        inv_no, do_date, subtotal, building = get_scanned_data(image)
+    doubtful_pages = []
+    for page_index, image in enumerate(preprocessed_images):
+        inv_no, do_date, subtotal, building, subtotal_doubtful = get_scanned_data(get_page_document(image, region_ocr))
         inv_no_list.append(inv_no)
         do_date_list.append(do_date)
         subtotal_list.append(subtotal)
         building_list.append(building)
+        if subtotal_doubtful:
+            doubtful_pages.append(page_index + 1)
+
+    # Report doubtful subtotals, as they decide where each DO ends
+    report_doubtful_pages(file_path, doubtful_pages)
 
     # Get the start and end positions of each DO
     subtotal_positions = [i for i, x in enumerate(subtotal_list) if x is not None]
@@ -257,6 +274,41 @@ def get_scanned_info(file_path):
     return start_indices, end_indices, inv_no_list, do_date_list, building_list
 
 
+def valid_page_tables(page_tables):
+    """
+    Check that the tables read with the layout hints look right: there is at
+    least one table, and every table has the columns of a DO table.
+
+    Args:
+        page_tables (dict): Lists of tables, keyed by page number starting from 1
+
+    Returns:
+        valid (bool): Whether the tables can be used
+    """
+    tables = [df.dropna(axis=1, how="all") for tables in page_tables.values() for df in tables if not df.empty]
+    return bool(tables) and all(len(df.columns) == do_table_width for df in tables)
+
+
+def read_tabula_tables(file_path):
+    """
+    Read the tables of all pages with tabula. The layout hints are used if
+    calibrated, and tabula guesses the tables if the hinted tables are not valid.
+
+    Args:
+        file_path (str): The path to the PDF file to be processed.
+
+    Returns:
+        page_tables (dict): Lists of tables, keyed by page number starting from 1
+    """
+    hints = load_layout_hints(vendor_dir)
+    if hints is not None:
+        page_tables = read_page_tables(file_path, **hint_options(hints))
+        if valid_page_tables(page_tables):
+            return page_tables
+
+    return read_page_tables(file_path)
+
+
 def get_scanned_tables(file_path):
     """
     Extracts and processes tabular data from scanned PDFs.
@@ -273,10 +325,16 @@ def get_scanned_tables(file_path):
     # Get scanned info
     start_indices, end_indices, inv_no_list, do_date_list, building_list = get_scanned_info(file_path)
 
+    # Read the tables of all pages at once, keyed by page number
+    if table_engine == "words":
+        page_tables, _ = read_word_tables(file_path, word_headers, "QTY", sub_total_pattern)
+    else:
+        page_tables = read_tabula_tables(file_path)
+
     for start, end in zip(start_indices, end_indices):
         # Get all dataframes for the same DO and combine them
         do_pages = list(range(start + 1, end + 2))  # Page index starts from 1
-        df_list = tabula.read_pdf(file_path, pages=do_pages)
+        df_list = [df for page in do_pages for df in page_tables.get(page, [])]
         df_list = [df.dropna(axis=1, how="all") for df in df_list if not df.empty]
 
         # If no valid data extracted, continue to next DO
@@ -377,56 +435,35 @@ def get_scanned_tables(file_path):
         df_do["DO Date"] = formatted_date
         df_do["Building"] = building_list[start]
 
-        # Get summary data and update remaining NaN columns
+        # Get summary data of each description, in order of appearance, and update remaining NaN columns
         df_do = df_do.reset_index(drop=True)
-        total_amt = 0
         unique_desc = df_do["Description2"].unique()
-        for i, desc in enumerate(unique_desc):
-            filtered_df = df_do[df_do["Description2"] == desc]
-
-            # Skip if empty
-            if len(filtered_df) == 0:
-                continue
-
-            # Get summary
-            total_qty = filtered_df["Qty"].sum()
-            unit = filtered_df["Unit"].values[0]
-            unit_rate = filtered_df["Unit Rate"].mean()
-            subtotal_amt = total_qty * unit_rate
-
-            # Update columns
-            df_do.loc[i, "Description"] = desc
-            df_do.loc[i, "Total Qty"] = total_qty
-            df_do.loc[i, "Unit"] = unit
-            df_do.loc[i, "Unit Rate"] = unit_rate
-            df_do.loc[i, "Subtotal Amount"] = subtotal_amt
-
-            # Track total amount
-            total_amt += subtotal_amt
+        groups = df_do.groupby("Description2", sort=False)
+        summary = pd.DataFrame(
+            {
+                "Description": unique_desc,
+                "Total Qty": groups["Qty"].sum().reindex(unique_desc),
+                "Unit": df_do.drop_duplicates("Description2").set_index("Description2")["Unit"].reindex(unique_desc),
+                "Unit Rate": groups["Unit Rate"].mean().reindex(unique_desc),
+            }
+        ).reset_index(drop=True)
+        summary["Subtotal Amount"] = summary["Total Qty"] * summary["Unit Rate"]
+
+        # Update the first rows, skipping any empty description
+        summary = summary[summary["Description"].notna()]
+        df_do["Unit"] = df_do["Unit"].astype("object")
+        df_do["Unit Rate"] = df_do["Unit Rate"].astype("object")
+        df_do.loc[summary.index, summary.columns] = summary
 
         # Update total amount
-        df_do.loc[0, "Total Amt per Inv"] = total_amt
+        df_do.loc[0, "Total Amt per Inv"] = sum(summary["Subtotal Amount"])
 
         # Empty out non-unique unit and unit rate rows, as per requirements
-        df_do["Unit"] = df_do["Unit"].astype("object")
-        df_do["Unit Rate"] = df_do["Unit Rate"].astype("object")
         df_do.loc[len(unique_desc) :, "Unit"] = pd.NA
         df_do.loc[len(unique_desc) :, "Unit Rate"] = pd.NA
 
         # Get data for "Code" columns
-        df_codes = df_do["Description2"].apply(extract_description)
-        df_codes = pd.DataFrame(df_codes.tolist(), columns=["Conc. Grade", "Conc. Slump", "Admix. 1", "Admix. 2"])
-        df_do[["Conc. Grade", "Conc. Slump", "Admix. 1", "Admix. 2"]] = df_codes
-
-        # Loop through each index in the DataFrame and update
-        for i in df_do.index:
-            # For concrete slump, strip and append "MM" if not NaN
-            if pd.notna(df_do.at[i, "Conc. Slump"]):
-                df_do.at[i, "Conc. Slump"] = df_do.at[i, "Conc. Slump"].strip() + "MM"
-
-            # For Admixture 2, strip and append "R" only if the value is not NaN or empty
-            if pd.notna(df_do.at[i, "Admix. 2"]) and df_do.at[i, "Admix. 2"].strip() != "":
-                df_do.at[i, "Admix. 2"] = df_do.at[i, "Admix. 2"].strip() + "R"
+        df_do[["Conc. Grade", "Conc. Slump", "Admix. 1", "Admix. 2"]] = extract_descriptions(df_do["Description2"])
 
         # Drop unused columns
         df_do = df_do.drop("Qty+Unit", axis=1)
@@ -13,6 +13,8 @@ from PyPDF2 import PdfReader
 
 # Custom
 from .panu_utils import add_data, get_data, get_totals, process_comment
+from ..common.line_classifier import LineClassifier
+from ..common.results import ResultAccumulator
 
 ##################
 # Configurations #
@@ -32,6 +34,17 @@ loc_subcon_pattern = re.compile(
     r'\s*\)?'                                       # Make closing parenthesis optional
 )
 
+# Keywords that route each line to the patterns it may match, in one pass over the line
+line_classifier = LineClassifier({
+    "inv_no": re.escape("INVOICE NO"),
+    "date": "DATE",
+    "loc_subcon": re.escape("LOCATION/SITE"),
+    "details": r"^\d{2}/\d{2}/\d{4}\s",
+    "split": r"^\d+%",
+    "underload": re.escape("UNDERLOAD CHARGES"),
+    "sub_total": re.escape("SUB-TOTAL"),
+})
+
 #############
 # Functions #
 #############
@@ -117,6 +130,11 @@ def process_pdf(df_all, pdf_file_paths):
         r' (\d{1,3}(?:,\d{3})*\.\d{2})'    # Same format number as above
     )
 
+    # Collect the rows of all files, after any rows given
+    results = ResultAccumulator(data_headers)
+    if df_all is not None:
+        results.add_frame(df_all)
+
     # Loop through all PDF files
     for f in pdf_file_paths:
         pdf_file = PdfReader(open(f, 'rb'))
@@ -134,22 +152,28 @@ def process_pdf(df_all, pdf_file_paths):
             lines = text.split('\n')
 
             for i, line in enumerate(lines):
+                # Skip lines without any keyword
+                kinds = line_classifier.classify(line)
+                if not kinds:
+                    continue
+
                 # Get reference number
-                if ref_no is None and 'INVOICE NO' in line.upper():
+                if ref_no is None and 'inv_no' in kinds:
                     inv_no = re.search(r'\d{9}', lines[i+1])[0]
 
                 # Get invoice date
-                if date is None and ('DATE' in line.upper()) and (lines[i+1].count('/') == 2):
+                if date is None and ('date' in kinds) and (lines[i+1].count('/') == 2):
                     date = re.search(r'\d{2}/\d{2}/\d{4}', lines[i+1])[0]
                     date = pd.to_datetime(date, format='%d/%m/%Y').strftime('%d-%b-%y')
 
                 # Get subcon and location
-                match = re.search(loc_subcon_pattern, line)
+                match = re.search(loc_subcon_pattern, line) if 'loc_subcon' in kinds else None
                 if match:
                     # For multiple lines with location and subcon
                     if ")" not in line:
                         line = (line.strip() + " " + lines[i+1].strip()).strip()
                         match = re.search(loc_subcon_pattern, line)
+                        kinds = line_classifier.classify(line)
 
                     # Extract location, subcon, and building
                     subcon = (match.group("subcon") or "").strip().upper()
@@ -157,8 +181,8 @@ def process_pdf(df_all, pdf_file_paths):
                     building = (match.group("building") or "").strip().upper()
 
                 # Get invoice details
-                match = pattern.match(line)
-                split_match2 = split_pattern2.match(line)
+                match = pattern.match(line) if 'details' in kinds else None
+                split_match2 = split_pattern2.match(line) if 'split' in kinds else None
 
                 if match:
                     do_line = list(match.groups())
@@ -213,11 +237,11 @@ def process_pdf(df_all, pdf_file_paths):
                         contents.append([do_mth, do_date, do_no, do_desc, do_qty, do_unitprice])
 
                 # Get underload charges
-                if 'UNDERLOAD CHARGES' in line.upper():
+                if 'underload' in kinds:
                     underload_unitprice = line.split(' ')[-1]
 
                 # Get sub-total
-                if 'SUB-TOTAL' in line.upper():
+                if 'sub_total' in kinds:
                     sub_total = float(line.split('$')[-1].replace(',', ''))
 
         # Get unique descriptions and total qty
@@ -273,16 +297,12 @@ def process_pdf(df_all, pdf_file_paths):
             building=building,
         )
 
-        # Add empty row
-        df_data.loc[total_rows] = pd.Series(dtype='object')
+        # Add the rows of the file, and an empty row
+        results.add_frame(df_data)
+        results.add_empty_row()
 
-        # Append data to df_all
-        if df_all is None:
-            df_all = df_data
-        else:
-            df_all = pd.concat([df_all, df_data], ignore_index=True)
-
-    return df_all
+    # Build the dataframe once, from the rows of all files
+    return results.build()
 
 
 def process_excel(excel_file_path):
@@ -11,11 +11,22 @@ import os
 import pytesseract
 import streamlit as st
 from dotenv import load_dotenv
-from pdf2image import convert_from_path
+from PyPDF2 import PdfReader
 
 # Custom
-from .sinmix_utils import extract_text_from_page, find_do_number, save_page_as_pdf
-from ...config import poppler_path, tesseract_path
+from .sinmix_utils import (
+    decode_do_symbol,
+    get_output_page,
+    read_do_number,
+    render_dpi,
+    save_page_as_pdf,
+    symbol_search,
+)
+from ..common.digits import save_templates
+from ..common.recipe_stats import rank_recipes, record_success, save_stats, source_key
+from ..common.render import render_page
+from ...archive import ZipArchiveWriter
+from ...config import tesseract_path
 
 ##################
 # Configurations #
@@ -25,6 +36,9 @@ from ...config import poppler_path, tesseract_path
 load_dotenv()
 output_path = os.getenv('OUTPUT_PATH')
 
+# Archive the split pages are written into, as served by download_zip
+archive_path = os.path.join(output_path, "SINMIX.zip")
+
 pytesseract.pytesseract.tesseract_cmd = tesseract_path
 
 # Contrast for image enhancement
@@ -52,34 +66,55 @@ def sinmix_main(pdf_file_paths):
     progress = st.progress(0)
     status_text = st.empty()
 
-    # Iterate through files
-    for index, f in enumerate(pdf_file_paths):
-        num_pages = len(convert_from_path(f, poppler_path=poppler_path))
-
-        # Iterate through pages of file
-        for page_number in range(1, num_pages + 1):
-            do_found = False
+    # Remove the archive of an earlier run, so that a run that fails leaves none to download
+    if os.path.exists(archive_path):
+        os.remove(archive_path)
+
+    # Split pages are written straight into the archive, which is finished once all files are done
+    with ZipArchiveWriter(archive_path) as archive:
+        # Iterate through files
+        for index, f in enumerate(pdf_file_paths):
+            # Open the file once, its pages are copied out as they are identified
+            reader = PdfReader(f)
+            num_pages = len(reader.pages)
+
+            # Contrast levels are tried in order of how often they worked for this source
+            source = source_key("SINMIX", f, reader)
+
+            # Iterate through pages of file
+            for page_number in range(1, num_pages + 1):
+                do_found = False
+
+                # Render the page once, all contrast levels are derived from it
+                image = render_page(f, page_number, dpi=render_dpi)
+
+                if image is not None:
+                    # Accept a DO number encoded in a barcode or QR code without any OCR
+                    do_number = decode_do_symbol(image) if symbol_search else None
+                    if not do_number:
+                        contrasts = rank_recipes(source, range(initial_contrast, max_contrast + 1))
+                        do_number, contrast = read_do_number(f, page_number, image, contrasts)
+                        if contrast is not None:
+                            record_success(source, contrast)
 
-            # Iterate through different contrast levels
-            for contrast in range(initial_contrast, max_contrast + 1):
-                text = extract_text_from_page(f, page_number, contrast)
-                if text:
-                    do_number = find_do_number(text)
                     if do_number:
-                        save_page_as_pdf(f, page_number, do_number, output_path)
+                        save_page_as_pdf(get_output_page(f, reader, page_number, image), do_number, archive)
                         do_found = True
-                        break
-
-            # If DO number is not found, add to error dictionary
-            if not do_found:
-                filename = f.split('/')[-1]
-                if filename not in error_dict:
-                    error_dict[filename] = []
-                error_dict[filename].append(page_number)
-
-        # Update the Streamlit progress bar
-        percent_complete = (index + 1) / len(pdf_file_paths)
-        progress.progress(percent_complete)
-        status_text.text(f"Processed: {index + 1}/{len(pdf_file_paths)} files ({int(percent_complete*100)}% complete)")
+
+                # If DO number is not found, add to error dictionary
+                if not do_found:
+                    filename = f.split('/')[-1]
+                    if filename not in error_dict:
+                        error_dict[filename] = []
+                    error_dict[filename].append(page_number)
+
+            # Update the Streamlit progress bar
+            percent_complete = (index + 1) / len(pdf_file_paths)
+            progress.progress(percent_complete)
+            status_text.text(f"Processed: {index + 1}/{len(pdf_file_paths)} files ({int(percent_complete*100)}% complete)")
+
+    # Keep the stats and the harvested glyphs for the next batch
+    save_stats()
+    save_templates()
 
     return error_dict
@@ -5,79 +5,447 @@
 ####################
 
 # Generic/Built-in
+import atexit
+import io
 import os
 import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Libs
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import ImageEnhance
+import cv2
+import numpy as np
+from PIL import Image
+from PyPDF2 import PdfReader, PdfWriter
 
 # Custom
-from ...config import poppler_path
+from ..common.digits import harvest_digits, recognize_digits
+from ..common.normalize import downsample, normalize_page, page_key
+from ..common.page_model import build_page_document, crop_padding
+from ..common.render import render_page
+from ..common.reocr import OcrRecipe, adjust_contrast, read_crop, read_field, retry_confidence
+
+##################
+# Configurations #
+##################
+
+do_pattern = r'\b\d{8}\b'
+
+# DPI pages are rendered at for OCR
+render_dpi = 200
+
+# Recipes used to re-read a DONO line that tesseract is unsure of
+do_recipes = (
+    OcrRecipe(),
+    OcrRecipe(contrast=2),
+    OcrRecipe(contrast=4, threshold="otsu"),
+    OcrRecipe(contrast=6, scale=2.0),
+    OcrRecipe(threshold="adaptive", scale=2.0),
+)
+
+# Whether to look for a barcode or QR code holding the DO number before any OCR
+symbol_search = True
+
+# Whether to read only the DONO region of a page before falling back to the whole page
+roi_search = True
+
+# Scale of the quick pass used to locate the DONO label
+locate_scale = 0.5
+
+# Smallest width of the DONO value region, as a fraction of the page width
+do_value_width = 0.3
+
+# Characters allowed when reading the DONO value region
+do_whitelist = "0123456789"
+
+# Whether to match DO numbers against glyphs harvested from earlier reads before calling tesseract
+template_digits = True
+
+# DONO value region of each file, keyed by path and modification time
+do_regions = {}
+
+# Gray level below which a pixel counts as ink
+ink_level = 128
+
+# Smallest fraction of ink pixels for a remembered DONO value region to be reused on a page
+min_ink_fraction = 0.01
+
+# Whether to read the whole page at several contrast levels concurrently, keeping the first valid read
+contrast_racing = False
+
+# Number of contrast levels read at the same time, across all pages
+race_workers = max((os.cpu_count() or 1) // 2, 1)
+
+# Shared by all races, so that the number of concurrent reads stays capped
+race_executor = ThreadPoolExecutor(max_workers=race_workers)
+atexit.register(race_executor.shutdown, wait=False, cancel_futures=True)
+
+# Encoding of output pages that have no text layer: "g4" for bilevel CCITT Group 4,
+# "jpeg" for grayscale JPEG, or "original" to copy them as they are
+output_encoding = "g4"
+
+# DPI image-only pages are re-encoded at
+output_dpi = 200
+
+# JPEG quality of re-encoded grayscale pages
+jpeg_quality = 60
 
 #############
 # Functions #
 #############
 
-def extract_text_from_page(pdf_path, page_number, contrast):
+def straighten_sinmix_page(pdf_path, page_number, image):
     """
-    Extract text from a specific page of the PDF using OCR.
+    Straighten a rendered page into the grayscale array that every contrast level
+    is derived from.
 
     Args:
         pdf_path (str): Path to the PDF file
-        page_number (int): Page number to extract text from
-        contrast (int): Contrast value for image enhancement
+        page_number (int): Page number of the rendered page
+        image (PIL.Image.Image): Rendered page
+
+    Returns:
+        gray (numpy.ndarray): Straightened grayscale page
+    """
+    # Fix the orientation and skew of the page before enhancing it
+    normalized = normalize_page(image, key=page_key(pdf_path, page_number - 1, render_dpi), binarize=False)
+    return np.array(normalized)
+
+
+def decode_do_symbol(image):
+    """
+    Decode the DO number from a barcode or QR code on the page, without any OCR.
+
+    Args:
+        image (PIL.Image.Image): Rendered page
 
     Returns:
-        text (str): Extracted text
-    """
-    images = convert_from_path(pdf_path, first_page=page_number, last_page=page_number, poppler_path=poppler_path)
-    if images:
-        img = images[0].convert('L')
-        enhancer = ImageEnhance.Contrast(img)
-        img_enhanced = enhancer.enhance(contrast)
-        return pytesseract.image_to_string(img_enhanced)
+        do (str or None): DO number, or None if no symbol encodes a valid one
+    """
+    small = downsample(np.array(image.convert("L")))
+
+    decoded = []
+    found, texts, _, _ = cv2.barcode.BarcodeDetector().detectAndDecodeMulti(small)
+    if found:
+        decoded.extend(texts)
+    found, texts, _, _ = cv2.QRCodeDetector().detectAndDecodeMulti(small)
+    if found:
+        decoded.extend(texts)
+
+    for text in decoded:
+        if re.fullmatch(do_pattern, text.strip()):
+            return text.strip()
     return None
 
 
-def find_do_number(text):
+def extract_document_from_page(gray, contrast):
+    """
+    Extract the document model of a rendered page using OCR.
+
+    Args:
+        gray (numpy.ndarray): Straightened grayscale page from straighten_sinmix_page
+        contrast (int): Contrast value for image enhancement
+
+    Returns:
+        document (PageDocument): Words and lines read from the page
     """
-    Find the DO number from the extracted text.
+    return build_page_document(Image.fromarray(adjust_contrast(gray, contrast)))
+
+
+def do_region_from_document(document, scale=1.0):
+    """
+    Get the region holding the DO number from the DONO line of a document.
 
     Args:
-        text (str): Extracted text
+        document (PageDocument): Document model of the page
+        scale (float): Optional. Scale the document was read at. Defaults to 1.0
+
+    Returns:
+        region (tuple or None): (left, top, right, bottom) of the DO number on the
+        full-size page, or None if no DONO line was read
+    """
+    lines = document.find_lines('DONO')
+    if not lines:
+        return None
+    left, top, right, bottom = lines[0].box_after('DONO')
+    # The value may not have been read at all, so leave room for it
+    right = max(right, left + int(document.image.width * do_value_width))
+    return tuple(int(value / scale) for value in (left, top, right, bottom))
+
+
+def region_has_ink(gray, region):
+    """
+    Check that a region of a page is not blank, as a region remembered from one
+    page of a file misses the DO number on pages laid out differently.
+
+    Args:
+        gray (numpy.ndarray): Straightened grayscale page from straighten_sinmix_page
+        region (tuple): (left, top, right, bottom) of the region
+
+    Returns:
+        has_ink (bool): Whether enough of the region is ink
+    """
+    left, top, right, bottom = region
+    crop = gray[max(top, 0) : bottom, max(left, 0) : right]
+    return crop.size > 0 and np.mean(crop < ink_level) >= min_ink_fraction
+
+
+def locate_do_region(pdf_path, gray):
+    """
+    Locate the DO number region of a file with a quick low-resolution pass over
+    one of its pages. The region is located once per file and reused for the
+    rest of its pages, as long as it has ink on them. A page where the DONO label
+    is not found is not remembered, so the next page is located again.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        gray (numpy.ndarray): Straightened grayscale page from straighten_sinmix_page
+
+    Returns:
+        region (tuple or None): (left, top, right, bottom) of the DO number, or
+        None if the DONO label was not found
+    """
+    key = (os.path.abspath(pdf_path), os.path.getmtime(pdf_path))
+    region = do_regions.get(key)
+    if region is not None and region_has_ink(gray, region):
+        return region
+
+    small = cv2.resize(gray, None, fx=locate_scale, fy=locate_scale, interpolation=cv2.INTER_AREA)
+    region = do_region_from_document(build_page_document(Image.fromarray(small)), scale=locate_scale)
+    if region is not None:
+        do_regions[key] = region
+    return region
+
+
+def remember_do_region(pdf_path, document):
+    """
+    Remember the DO number region of a file from a full page read, so that its
+    later pages can be read from the region alone.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        document (PageDocument): Document model of a page of the file
+    """
+    region = do_region_from_document(document)
+    if region:
+        do_regions[(os.path.abspath(pdf_path), os.path.getmtime(pdf_path))] = region
+
+
+def find_do_number_in_region(pdf_path, gray, contrasts):
+    """
+    Find the DO number by reading only the DONO region of the page, with digits
+    whitelisted, at each contrast level in turn.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        gray (numpy.ndarray): Straightened grayscale page from straighten_sinmix_page
+        contrasts (iterable): Contrast values to try, in order
+
+    Returns:
+        do (str or None): DO number, or None if the region did not give one confidently
+        contrast (int or None): Contrast value the DO number was read at, or None
+        if it was read from the templates
+    """
+    region = locate_do_region(pdf_path, gray)
+    if region is None:
+        return None, None
+
+    left, top, right, bottom = region
+    crop = gray[max(top - crop_padding, 0) : bottom + crop_padding, max(left - crop_padding, 0) : right + crop_padding]
+    if crop.size == 0:
+        return None, None
+
+    # The DO number is printed in the same font every time, so try the templates first
+    crop_image = Image.fromarray(crop)
+    text = recognize_digits(crop_image, "SINMIX") if template_digits else None
+    match = re.search(do_pattern, text) if text else None
+    if match:
+        return match.group(0), None
+
+    for contrast in contrasts:
+        text, conf = read_crop(Image.fromarray(adjust_contrast(crop, contrast)), OcrRecipe(), whitelist=do_whitelist)
+        match = re.search(do_pattern, text)
+        if match and conf >= retry_confidence:
+            if template_digits:
+                harvest_digits(crop_image, match.group(0), "SINMIX")
+            return match.group(0), contrast
+    return None, None
+
+
+def find_do_number(document):
+    """
+    Find the DO number from the extracted document.
+
+    Args:
+        document (PageDocument): Document model of the page
 
     Returns:
         do (str): DO number
     """
-    do_pattern = r'\b\d{8}\b'
-    lines = text.split('\n')
-    for line in lines:
-        if 'DONO' in line.upper():
-            matches = re.findall(do_pattern, line)
-            do = matches[0] if matches else None
-            if do and len(do) == 8:
-                return do
+    match = read_field(document, 'DONO', do_pattern, recipes=do_recipes, font="SINMIX" if template_digits else None)
+    do = match.group(0) if match else None
+    if do and len(do) == 8:
+        return do
     return None
 
 
-def save_page_as_pdf(original_pdf_path, page_number, do_number, output_directory):
+def race_contrasts(pdf_path, gray, contrasts):
+    """
+    Read the whole page at several contrast levels concurrently, with at most
+    race_workers levels started at a time. The first level that gives a valid DO
+    number wins. Once a level reads the DONO line, its crop has already been
+    retried, so no further levels are submitted. On return, only levels still
+    queued in race_executor are cancelled: tesseract reads already running
+    cannot be stopped and finish in the background, holding at most
+    race_workers threads of the pool until they do.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        gray (numpy.ndarray): Straightened grayscale page from straighten_sinmix_page
+        contrasts (iterable): Contrast values to try, submitted in order
+
+    Returns:
+        do (str or None): DO number, or None if no contrast level gave one
+        contrast (int or None): Contrast value the DO number was read at
+    """
+    def read_contrast(contrast):
+        document = extract_document_from_page(gray, contrast)
+        return document, find_do_number(document)
+
+    pending = iter(contrasts)
+    futures = {}
+
+    def submit_next():
+        contrast = next(pending, None)
+        if contrast is not None:
+            futures[race_executor.submit(read_contrast, contrast)] = contrast
+
+    for _ in range(race_workers):
+        submit_next()
+
+    dono_read = False
+    try:
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                contrast = futures.pop(future)
+                document, do_number = future.result()
+                if do_number:
+                    return do_number, contrast
+                if document.find_lines('DONO'):
+                    remember_do_region(pdf_path, document)
+                    dono_read = True
+            if not dono_read:
+                for _ in done:
+                    submit_next()
+    finally:
+        # Only drops levels that have not started, running reads finish on their own
+        for future in futures:
+            future.cancel()
+    return None, None
+
+
+def read_do_number(pdf_path, page_number, image, contrasts):
     """
-    Save the specified page of the original PDF to the output directory with a new name.
+    Read the DO number of a rendered page with OCR. The DONO region is read first,
+    then the whole page at each contrast level until a DONO line is read, or several
+    levels at once when contrast_racing is on.
 
     Args:
-        original_pdf_path (str): Path to the original PDF file
-        page_number (int): Page number to save
+        pdf_path (str): Path to the PDF file
+        page_number (int): Page number of the rendered page
+        image (PIL.Image.Image): Rendered page
+        contrasts (iterable): Contrast values to try, in order
+
+    Returns:
+        do (str or None): DO number, or None if it could not be read
+        contrast (int or None): Contrast value the DO number was read at, or None
+        if it was read from the templates
+    """
+    gray = straighten_sinmix_page(pdf_path, page_number, image)
+
+    # Read only the DONO region first, then fall back to the whole page
+    if roi_search:
+        do_number, contrast = find_do_number_in_region(pdf_path, gray, contrasts)
+        if do_number:
+            return do_number, contrast
+
+    if contrast_racing:
+        return race_contrasts(pdf_path, gray, contrasts)
+
+    # Iterate through different contrast levels, until a DONO line is read
+    for contrast in contrasts:
+        document = extract_document_from_page(gray, contrast)
+        do_number = find_do_number(document)
+        if do_number:
+            return do_number, contrast
+
+        # The DONO line was read, so its crop has already been retried
+        if document.find_lines('DONO'):
+            remember_do_region(pdf_path, document)
+            break
+    return None, None
+
+
+def encode_page(image):
+    """
+    Encode a rendered page as a compact single-page PDF, according to output_encoding.
+
+    Args:
+        image (PIL.Image.Image): Page rendered at output_dpi
+
+    Returns:
+        page (PyPDF2.PageObject): Page of the encoded PDF
+    """
+    gray = np.array(image.convert("L"))
+    pdf_bytes = io.BytesIO()
+    if output_encoding == "jpeg":
+        Image.fromarray(gray).save(pdf_bytes, "PDF", resolution=output_dpi, quality=jpeg_quality)
+    else:
+        # Bilevel pages are stored with CCITTFaxDecode when Pillow is built with libtiff
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        Image.fromarray(binary).convert("1", dither=Image.Dither.NONE).save(pdf_bytes, "PDF", resolution=output_dpi)
+    return PdfReader(pdf_bytes).pages[0]
+
+
+def get_output_page(pdf_path, reader, page_number, image=None):
+    """
+    Get the page to write out for a page of the original PDF. Pages with a text
+    layer are copied as they are, while image-only pages are re-encoded compactly
+    unless output_encoding is "original".
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        reader (PyPDF2.PdfReader): Reader of the PDF file
+        page_number (int): Page number to write out
+        image (PIL.Image.Image): Optional. Page already rendered at render_dpi
+
+    Returns:
+        page (PyPDF2.PageObject): Page to write out
+    """
+    page = reader.pages[page_number - 1]
+    if output_encoding == "original" or page.extract_text().strip():
+        return page
+
+    # Reuse the render made for OCR when it is already at the output DPI
+    if image is None or output_dpi != render_dpi:
+        image = render_page(pdf_path, page_number, dpi=output_dpi)
+        if image is None:
+            return page
+    return encode_page(image)
+
+
+def save_page_as_pdf(page, do_number, archive):
+    """
+    Add a page to the result archive as a single-page PDF named after its DO number.
+
+    Args:
+        page (PyPDF2.PageObject): Page from get_output_page
         do_number (str): DO number
-        output_directory (str): Path to the output directory
-    """
-    images = convert_from_path(original_pdf_path, first_page=page_number, last_page=page_number, poppler_path=poppler_path)
-    if images:
-        save_path = os.path.join(output_directory, f"{do_number}.pdf")
-        count = 1
-        while os.path.exists(save_path):
-            save_path = os.path.join(output_directory, f"{do_number} ({count}).pdf")
-            count += 1
-        images[0].save(save_path, "PDF")
-        
\ No newline at end of file
+        archive (ZipArchiveWriter): Archive holding the split pages
+    """
+    writer = PdfWriter()
+    writer.add_page(page)
+
+    pdf_bytes = io.BytesIO()
+    writer.write(pdf_bytes)
+    archive.write(do_number, pdf_bytes.getvalue())
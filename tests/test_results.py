@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Libs
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+
+# Custom
+from src.process.common.results import ResultAccumulator
+
+##################
+# Configurations #
+##################
+
+data_headers = ["Inv No.", "DO No.", "Qty", "Amount"]
+
+#############
+# Functions #
+#############
+
+def invoice_frames():
+    """
+    Build the invoice frames of a vendor the way ACS and PANU do, with invoice and
+    DO numbers kept as text in object columns.
+    """
+    first = pd.DataFrame(
+        {"Inv No.": ["001234", None], "DO No.": ["00056789", "00056790"], "Qty": [2, 3], "Amount": [10.5, 7.25]},
+        columns=data_headers,
+    )
+    second = pd.DataFrame(
+        {"Inv No.": ["001235"], "DO No.": ["00056791"], "Qty": [1], "Amount": [4.0], "Code4": ["X"]},
+    )
+    object_ints = pd.DataFrame({"Inv No.": [1236], "DO No.": [56792]}, dtype=object)
+    return [first, second, object_ints]
+
+
+def concat_results(frames):
+    """
+    Combine the frames as the vendors did before ResultAccumulator, with an empty
+    row after each frame and one pd.concat per frame.
+    """
+    df_all = None
+    for df_data in frames:
+        df_data = df_data.copy()
+        df_data.loc[len(df_data)] = pd.Series(dtype="object")
+        df_all = df_data if df_all is None else pd.concat([df_all, df_data])
+    return df_all.reset_index(drop=True)
+
+
+def test_build_matches_concat():
+    frames = invoice_frames()
+    results = ResultAccumulator(data_headers)
+    for df_data in frames:
+        results.add_frame(df_data)
+        results.add_empty_row()
+    df = results.build()
+
+    pdt.assert_frame_equal(df, concat_results(frames))
+    assert df["Inv No."].tolist()[:2] == ["001234", None]
+    assert df["Qty"].dtype == np.float64
+
+
+def test_add_rows_keeps_text():
+    results = ResultAccumulator(data_headers)
+    results.add_rows({"Inv No.": ["1", None], "DO No.": [12345678, 12345679], "Qty": [1, 2]})
+    df = results.build()
+
+    assert (df.dtypes == object).all()
+    assert df["DO No."].tolist() == [12345678, 12345679]
+    assert df["Amount"].isna().all()
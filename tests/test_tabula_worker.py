@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import shutil
+import sys
+import time
+
+# Libs
+import pytest
+import tabula
+
+# Custom
+from src.process.common import tabula_worker
+
+##################
+# Configurations #
+##################
+
+# Stand-in for the Java worker, speaking the same protocol: "ok" answers with the
+# PDF path, "hang" never answers, "silent" never gets ready and "die" exits
+fake_worker = """
+import json, sys, time
+mode = sys.argv[1]
+if mode == "silent":
+    time.sleep(60)
+print("READY", flush=True)
+for line in sys.stdin:
+    args = json.loads(line)
+    if mode == "hang":
+        time.sleep(60)
+    if mode == "die":
+        sys.exit(1)
+    print("OK\\t" + json.dumps([{"data": [[{"text": args[-1]}]]}]), flush=True)
+"""
+
+# Rows of the table drawn in the sample PDF
+sample_rows = [["DO/NO", "QTY", "AMOUNT"], ["1234", "8.5", "850.00"], ["1235", "1", "1050.00"]]
+
+#############
+# Functions #
+#############
+
+@pytest.fixture
+def fake_command(tmp_path, monkeypatch):
+    """
+    Start workers from the fake worker script, with short deadlines.
+    """
+    script_path = tmp_path / "fake_worker.py"
+    script_path.write_text(fake_worker)
+    monkeypatch.setattr(tabula_worker, "ready_timeout", 1)
+    monkeypatch.setattr(tabula_worker, "answer_timeout", 1)
+    monkeypatch.setattr(tabula_worker, "workers_unavailable", False)
+
+    def use(mode):
+        monkeypatch.setattr(tabula_worker, "worker_command", lambda: [sys.executable, str(script_path), mode])
+
+    return use
+
+
+def write_sample_pdf(path):
+    """
+    Write a one-page PDF with the sample rows drawn as a plain text table.
+    """
+    text = "".join(
+        f"BT /F1 10 Tf {72 + 120 * k} {700 - 20 * i} Td ({cell}) Tj ET\n"
+        for i, row in enumerate(sample_rows)
+        for k, cell in enumerate(row)
+    )
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(text)} >>\nstream\n{text}endstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    path.write_bytes(pdf.encode("latin-1"))
+
+
+def test_paths_with_tabs_and_line_breaks(fake_command):
+    fake_command("ok")
+    worker = tabula_worker.TabulaWorker()
+    try:
+        assert worker.extract(["--format", "JSON", "/tmp/a\tb\nc.pdf"]) == [{"data": [[{"text": "/tmp/a\tb\nc.pdf"}]]}]
+    finally:
+        worker.stop()
+
+
+def test_hung_worker_is_killed(fake_command):
+    fake_command("hang")
+    worker = tabula_worker.TabulaWorker()
+    start = time.monotonic()
+    with pytest.raises(RuntimeError, match="timed out"):
+        worker.extract(["x.pdf"])
+    assert time.monotonic() - start < 5
+    assert worker.process is None
+
+
+def test_dead_worker_is_restarted_once(fake_command):
+    fake_command("die")
+    worker = tabula_worker.TabulaWorker()
+    with pytest.raises(RuntimeError, match="died"):
+        worker.extract(["x.pdf"])
+    assert worker.process is None
+
+
+def test_worker_that_never_starts_is_unavailable(fake_command):
+    fake_command("silent")
+    worker = tabula_worker.TabulaWorker()
+    with pytest.raises(RuntimeError, match="failed to start"):
+        worker.extract(["x.pdf"])
+    assert tabula_worker.workers_unavailable
+
+
+@pytest.mark.skipif(shutil.which("java") is None, reason="Java is not installed")
+def test_worker_matches_tabula(tmp_path, monkeypatch):
+    monkeypatch.setattr(tabula_worker, "class_dir", str(tmp_path / "classes"))
+    monkeypatch.setattr(tabula_worker, "workers_unavailable", False)
+    pdf_path = tmp_path / "sample\tinvoice.pdf"
+    write_sample_pdf(pdf_path)
+
+    options = {"guess": False, "stream": True}
+    args = tabula_worker.TabulaOption(pages=1, format="JSON", **options).build_option_list()
+    worker = tabula_worker.TabulaWorker()
+    try:
+        raw_tables = worker.extract(args + [str(pdf_path)])
+    finally:
+        worker.stop()
+
+    expected = tabula.read_pdf(str(pdf_path), pages=1, output_format="json", **options)
+    assert [[cell["text"] for cell in row] for row in raw_tables[0]["data"]] == sample_rows
+    assert [table["data"] for table in raw_tables] == [table["data"] for table in expected]
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Check the "words" table engine on synthetic word boxes of a BRC page, and that
+it reads the same item tables as tabula on sample PDFs of each vendor with the
+tabula JSON recorded beside them in tests/fixtures/word_tables/<VENDOR>/.
+Samples are invoices of real customers, so they are not kept in the
+repository; the equivalence test is skipped without them.
+
+Record a sample, with Java and the tabula jar installed, from the repository root:
+
+    python -m tests.test_word_tables BRC path/to/sample.pdf
+
+This copies the PDF into the fixtures and writes <sample>.json beside it, holding
+the raw tabula tables of each page, keyed by page number.
+"""
+
+####################
+# Required Modules #
+####################
+
+# Generic/Built-in
+import glob
+import json
+import os
+import shutil
+import sys
+
+# Libs
+import pandas as pd
+import pytest
+from PyPDF2 import PdfReader
+
+# Custom
+from src.process.brc import brc_utils
+from src.process.common import word_tables
+from src.process.common.pdf_tables import tables_from_json
+from src.process.common.tabula_worker import read_pdf_json
+from src.process.common.word_tables import group_rows, match_header, read_word_tables, split_cells
+from src.process.island import island_utils
+
+##################
+# Configurations #
+##################
+
+# Folder the samples and their recorded tabula JSON are kept in, per vendor
+fixtures_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "word_tables")
+
+# Headers, anchor column and end pattern each vendor reads its tables with
+vendor_options = {
+    "BRC": (brc_utils.word_headers, "QTY", brc_utils.total_pattern),
+    "ISLAND": (island_utils.word_headers, "QTY", island_utils.sub_total_pattern),
+}
+
+# Words of a BRC item table page, as (x_min, y_min, x_max, y_max, text), laid out
+# as pdftotext gives them: a 9-column header, an item with a wrapped description,
+# an item without a DO number and the total
+brc_words = [
+    (40, 100, 50, 110, "IT"), (70, 100, 100, 110, "DO/NO"), (130, 100, 200, 110, "DESCRIPTION"),
+    (300, 100, 320, 110, "QTY"), (340, 100, 365, 110, "UNIT"), (380, 101, 400, 111, "UNIT"),
+    (402, 100, 430, 110, "PRICE"), (445, 100, 460, 110, "PER"), (475, 100, 500, 110, "DISC."),
+    (520, 100, 525, 110, "$"), (527, 100, 570, 110, "AMOUNT"),
+    (42, 120, 48, 130, "1"), (65, 120, 110, 130, "12345678"), (130, 120, 180, 130, "Concrete"),
+    (185, 120, 205, 130, "G40"), (300, 120, 320, 130, "8.5"), (340, 120, 360, 130, "m3"),
+    (385, 120, 420, 130, "100.00"), (445, 120, 460, 130, "m3"), (478, 120, 500, 130, "5.00"),
+    (530, 120, 570, 130, "845.00"),
+    (130, 134, 180, 144, "pumped"),
+    (42, 150, 48, 160, "2"), (130, 150, 180, 160, "Waiting"), (300, 150, 320, 160, "1"),
+    (530, 150, 570, 160, "1,050.00"),
+    (130, 180, 180, 190, "TOTAL"), (530, 180, 570, 190, "1,895.00"),
+]
+
+#############
+# Functions #
+#############
+
+def find_samples():
+    """
+    Get the recorded samples of every vendor.
+
+    Returns:
+        samples (list[tuple]): (vendor, pdf_path) of each sample with its JSON recorded
+    """
+    return [
+        (vendor, pdf_path)
+        for vendor in vendor_options
+        for pdf_path in sorted(glob.glob(os.path.join(fixtures_path, vendor, "*.pdf")))
+        if os.path.exists(pdf_path[:-4] + ".json")
+    ]
+
+
+def record_sample(vendor, pdf_path):
+    """
+    Copy a sample PDF into the fixtures of a vendor and record its tabula tables.
+
+    Args:
+        vendor (str): Vendor of the sample, e.g. "BRC"
+        pdf_path (str): Path to the sample PDF
+    """
+    vendor_path = os.path.join(fixtures_path, vendor)
+    os.makedirs(vendor_path, exist_ok=True)
+    sample_path = os.path.join(vendor_path, os.path.basename(pdf_path))
+    shutil.copyfile(pdf_path, sample_path)
+
+    recorded = {
+        page_number: read_pdf_json(sample_path, pages=page_number)
+        for page_number in range(1, len(PdfReader(sample_path).pages) + 1)
+    }
+    with open(sample_path[:-4] + ".json", "w", encoding="utf-8") as json_file:
+        json.dump(recorded, json_file)
+
+
+def item_table(tables, labels):
+    """
+    Get the item table among the tables of a page, as text with wrapped lines joined.
+
+    Args:
+        tables (list[pandas.core.frame.DataFrame]): Tables of the page
+        labels (list[str]): Columns of the item table, as read by the words engine
+
+    Returns:
+        table (pandas.core.frame.DataFrame or None): Item table, or None if the page has none
+    """
+    for table in tables:
+        if all(label in table.columns for label in labels):
+            table = table[labels].astype(str).where(table[labels].notna(), "")
+            return table.replace(r"\r", " ", regex=True).apply(lambda column: column.str.strip())
+    return None
+
+
+@pytest.fixture
+def brc_page(monkeypatch):
+    """
+    Stub pdftotext with a single BRC item table page, followed by a blank page.
+    """
+    monkeypatch.setattr(word_tables, "read_word_boxes", lambda file_path: [brc_words, []])
+
+
+def test_group_rows_joins_words_of_a_line():
+    rows = group_rows(brc_words)
+    assert [len(row) for row in rows] == [11, 10, 1, 4, 2]
+    assert [word[4] for word in rows[0][5:7]] == ["UNIT", "PRICE"]
+
+
+def test_match_header_finds_all_brc_columns():
+    columns = match_header(group_rows(brc_words)[0], brc_utils.word_headers)
+    assert [column[0] for column in columns] == [
+        "IT", "DO/NO", "DESCRIPTION", "QTY", "UNIT", "UNIT PRICE", "PER", "DISC.", "$ AMOUNT",
+    ]
+
+
+def test_match_header_rejects_other_rows():
+    assert match_header(group_rows(brc_words)[1], brc_utils.word_headers) is None
+
+
+def test_split_cells_keeps_item_and_discount_apart():
+    rows = group_rows(brc_words)
+    columns = match_header(rows[0], brc_utils.word_headers)
+    assert split_cells(rows[1], columns) == ["1", "12345678", "Concrete G40", "8.5", "m3", "100.00", "m3", "5.00", "845.00"]
+    assert split_cells(rows[3], columns) == ["2", "", "Waiting", "1", "", "", "", "", "1,050.00"]
+
+
+def test_read_word_tables_reads_brc_items(brc_page):
+    page_tables, end_page = read_word_tables("sample.pdf", brc_utils.word_headers, "QTY", brc_utils.total_pattern)
+    assert end_page == 1
+    assert page_tables[2] == []
+
+    table = page_tables[1][0]
+    assert table["DO/NO"].tolist()[0] == 12345678
+    assert pd.isna(table["DO/NO"].tolist()[1])
+    assert table["DESCRIPTION"].tolist() == ["Concrete G40\rpumped", "Waiting"]
+    assert table["$ AMOUNT"].tolist() == ["845.00", "1,050.00"]
+
+
+def test_brc_word_item_tables_drop_unused_columns(brc_page):
+    item_tables, page_no = brc_utils.get_word_item_tables("sample.pdf")
+    assert page_no == 1
+    assert item_tables[0].columns.tolist() == ["DO/NO", "DESCRIPTION", "QTY", "UNIT", "UNIT PRICE", "PER", "$ AMOUNT"]
+    assert item_tables[0]["QTY"].tolist() == [8.5, 1]
+
+
+@pytest.mark.skipif(not find_samples(), reason="No recorded samples in tests/fixtures/word_tables")
+@pytest.mark.parametrize("vendor, pdf_path", find_samples())
+def test_word_tables_match_tabula(vendor, pdf_path):
+    headers, anchor, end_pattern = vendor_options[vendor]
+    page_tables, _ = read_word_tables(pdf_path, headers, anchor, end_pattern)
+    with open(pdf_path[:-4] + ".json", "r", encoding="utf-8") as json_file:
+        recorded = json.load(json_file)
+
+    for page_number, tables in page_tables.items():
+        if not tables:
+            continue
+        labels = tables[0].columns.tolist()
+        expected = item_table(tables_from_json(recorded[str(page_number)]), labels)
+        assert expected is not None, f"Page {page_number} has no item table in tabula"
+        pd.testing.assert_frame_equal(item_table(tables, labels).reset_index(drop=True), expected.reset_index(drop=True))
+
+
+if __name__ == "__main__":
+    record_sample(sys.argv[1], sys.argv[2])